@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from .versions import bump_versions, get_version, token_scope
+
+"""
+    - Resolves the principal of an api request (token -> user -> profile -> organisation) in one query
+    - The resolved token is kept in the cache under the version stamp of its token scope, for
+      PRINCIPAL_CACHE_TIMEOUT seconds, so repeat requests with the same token only read the version
+    - api.signals bumps the version when the token is deleted or its user or profile changes. The stamps are
+      stored in the database, so every worker process stops using a changed principal on its next request.
+"""
+
+# the cache key for the principal resolved from a token, at a version of its token scope
+def principal_cache_key(token_key, version):
+    return f"api:principal:{token_key}:{version}"
+
+# move the token scopes of the given token keys to a new version, so no worker reuses them
+def invalidate_principals(token_keys):
+    bump_versions([token_scope(token_key) for token_key in token_keys])
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cache_key = principal_cache_key(key, get_version(token_scope(key)))
+        token = cache.get(cache_key)
+        if token is None:
+            try:
+                token = Token.objects.select_related('user__userprofile__organisation').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            cache.set(cache_key, token, settings.PRINCIPAL_CACHE_TIMEOUT)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        return (token.user, token)
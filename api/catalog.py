@@ -0,0 +1,76 @@
+import json
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from .models import OrganisationCustomListGroup, OrganisationCustomListOption
+from .versions import bump_version, catalog_scope, get_version
+
+"""
+    - The custom groups and items an organisation's members build their shopping lists from
+    - New organisations are given the default catalog template in settings.DEFAULT_ORGANISATION_CATALOG,
+      a json file of {"groups": [{"group_name": ..., "items": [item names]}]}
+    - The compiled catalog of each organisation is cached under the version stamp of its catalog scope, which
+      api.signals bumps whenever one of the organisation's groups or items is written, so a write never serves a
+      stale catalog. The stamps are stored in the database, so a write is seen by every worker process.
+"""
+
+# load a catalog template, once per process
+@lru_cache(maxsize=None)
+def load_catalog_template(path):
+    with open(path) as template_file:
+        return json.load(template_file)
+
+# get the default catalog template for new organisations
+def get_default_catalog():
+    return load_catalog_template(str(settings.DEFAULT_ORGANISATION_CATALOG))
+
+# create an organisation's groups and items from a catalog template, with one insert for the groups and one for the items
+def create_organisation_catalog(organisation, template):
+    groups = [
+        OrganisationCustomListGroup(organisation=organisation, group_name=group['group_name'])
+        for group in template['groups']
+    ]
+    OrganisationCustomListGroup.objects.bulk_create(groups)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # read the new group ids back where the database doesn't return them from the insert
+        group_ids = dict(
+            OrganisationCustomListGroup.objects.filter(organisation=organisation).values_list('group_name', 'id')
+        )
+        for group in groups:
+            group.id = group_ids[group.group_name]
+
+    OrganisationCustomListOption.objects.bulk_create([
+        OrganisationCustomListOption(organisation=organisation, group=group, item_name=item_name)
+        for group, group_template in zip(groups, template['groups'])
+        for item_name in group_template['items']
+    ])
+
+    # the bulk inserts don't send signals, so move the organisation's catalog to a new version here
+    bump_version(catalog_scope(organisation.id))
+
+# read an organisation's groups and their items from the database, as {group_name: [{item_id, item_name, price}]}
+def compile_organisation_catalog(organisation_id):
+    catalog = {}
+    for group in OrganisationCustomListGroup.objects.filter(organisation_id=organisation_id).order_by('id'):
+        catalog[group.group_name] = []
+    group_items = OrganisationCustomListOption.objects.filter(
+        organisation_id=organisation_id,
+        group__isnull=False
+    ).values_list('group__group_name', 'id', 'item_name', 'price').order_by('id')
+    for group_name, item_id, item_name, price in group_items:
+        catalog[group_name].append({
+            'item_id': item_id,
+            'item_name': item_name,
+            'price': price
+        })
+    return catalog
+
+# get an organisation's compiled catalog from the cache, compiling it on a miss
+def get_organisation_catalog(organisation_id):
+    key = f"api:catalog:{organisation_id}:{get_version(catalog_scope(organisation_id))}"
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = compile_organisation_catalog(organisation_id)
+        cache.set(key, catalog, settings.CATALOG_CACHE_TIMEOUT)
+    return catalog
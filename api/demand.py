@@ -0,0 +1,190 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from .models import (
+    OrganisationCustomListOption,
+    OrganisationItemDemand,
+    ListStatus,
+    ShoppingList,
+    ShoppingListItem
+)
+from .statuses import get_initial_status
+from .versions import bump_version, lists_scope
+
+"""
+    - Keeps OrganisationItemDemand in step with the shopping lists in their initial 'CREATED' state
+    - Each row counts the number of an organisation's CREATED lists that contain an item,
+      so the generated shopping list can be read without aggregating every open list
+    - The service functions call add_lists_demand when they bulk create lists and remove_lists_demand when they
+      bulk update lists out of the CREATED state, as bulk writes don't send signals. Every other write (a list
+      saved into or out of CREATED, an item saved or deleted, a list or user deleted with its items) is counted
+      by the api.signals receivers with the functions at the end of this module.
+    - rebuild_item_demand repairs any drift
+"""
+
+# the group name used for items that are not in one of the organisation's custom groups
+UNGROUPED_ITEMS = 'user custom items'
+
+# annotate a queryset of item name values with the organisation's custom group for each item,
+# ordered by group so the items come back in shopping order
+def annotate_item_groups(items, organisation):
+    # match each item name to the organisation's catalog to find its group
+    catalog_items = OrganisationCustomListOption.objects.filter(
+        organisation=organisation,
+        item_name=OuterRef('item_name'),
+        group__isnull=False
+    ).order_by('id')
+    return items.annotate(
+        group_id=Subquery(catalog_items.values('group_id')[:1]),
+        group_name=Subquery(catalog_items.values('group__group_name')[:1])
+    ).order_by(F('group_id').asc(nulls_last=True), 'item_name')
+
+"""
+    - Count the number of lists in their initial 'CREATED' state that contain each item, for one organisation
+    - A list is only counted once per item, however many times the item appears on it
+    - Runs as a single grouped query over the shopping lists, so this is the source of truth for the demand table
+"""
+def compute_item_demand(organisation, group_items=False):
+    initial_status = ListStatus.objects.filter(rank=0).values('label')[:1]
+    items = ShoppingListItem.objects.filter(
+        shopping_list__status=Subquery(initial_status),
+        shopping_list__user__userprofile__organisation=organisation
+    ).values('item_name').annotate(
+        list_count=Count('shopping_list', distinct=True)
+    )
+    if group_items:
+        return annotate_item_groups(items, organisation)
+    return items.order_by('item_name')
+
+# read the stored demand for an organisation, in the same shape as compute_item_demand
+def get_item_demand(organisation, group_items=False):
+    items = OrganisationItemDemand.objects.filter(
+        organisation=organisation,
+        list_count__gt=0
+    ).values('item_name', 'list_count')
+    if group_items:
+        return annotate_item_groups(items, organisation)
+    return items.order_by('item_name')
+
+# count the lists each item is on, counting a list once for each distinct item on it
+def count_list_items(lists_item_names):
+    counts = Counter()
+    for item_names in lists_item_names:
+        counts.update(set(item_names))
+    return counts
+
+# change the stored demand for each item by its count, with one update for every item
+def change_item_demand(organisation, counts, sign):
+    OrganisationItemDemand.objects.filter(
+        organisation=organisation,
+        item_name__in=counts.keys()
+    ).update(list_count=F('list_count') + Case(
+        *[When(item_name=item_name, then=Value(sign * count)) for item_name, count in counts.items()],
+        output_field=IntegerField()
+    ))
+
+# count new CREATED lists, given the item names on each list
+def add_lists_demand(organisation, lists_item_names):
+    counts = count_list_items(lists_item_names)
+    if not counts:
+        return
+    with transaction.atomic():
+        # make sure a row exists for every item before incrementing them
+        OrganisationItemDemand.objects.bulk_create(
+            [
+                OrganisationItemDemand(organisation=organisation, item_name=item_name)
+                for item_name in counts
+            ],
+            ignore_conflicts=True
+        )
+        change_item_demand(organisation, counts, 1)
+
+# stop counting lists that have left the CREATED state, given the item names on each list
+def remove_lists_demand(organisation, lists_item_names):
+    counts = count_list_items(lists_item_names)
+    if not counts:
+        return
+    with transaction.atomic():
+        change_item_demand(organisation, counts, -1)
+        OrganisationItemDemand.objects.filter(
+            organisation=organisation,
+            list_count__lte=0
+        ).delete()
+
+# count a new CREATED list once for each distinct item on it
+def add_list_demand(organisation, item_names):
+    add_lists_demand(organisation, [item_names])
+
+# stop counting a list that has left the CREATED state
+def remove_list_demand(organisation, item_names):
+    remove_lists_demand(organisation, [item_names])
+
+# compare the stored demand with a full recompute, returning {item_name: (stored, expected)} for every mismatch
+def diff_item_demand(organisation):
+    stored = {
+        row['item_name']: row['list_count']
+        for row in OrganisationItemDemand.objects.filter(organisation=organisation).values('item_name', 'list_count')
+    }
+    expected = {
+        row['item_name']: row['list_count']
+        for row in compute_item_demand(organisation)
+    }
+    differences = {}
+    for item_name in stored.keys() | expected.keys():
+        stored_count = stored.get(item_name, 0)
+        expected_count = expected.get(item_name, 0)
+        if stored_count != expected_count:
+            differences[item_name] = (stored_count, expected_count)
+    return differences
+
+# replace the stored demand for an organisation with a full recompute
+def rebuild_item_demand(organisation):
+    with transaction.atomic():
+        OrganisationItemDemand.objects.filter(organisation=organisation).delete()
+        OrganisationItemDemand.objects.bulk_create([
+            OrganisationItemDemand(
+                organisation=organisation,
+                item_name=row['item_name'],
+                list_count=row['list_count']
+            )
+            for row in compute_item_demand(organisation)
+        ])
+        # the generated list may have changed, so clients can't keep using their cached copy
+        bump_version(lists_scope(organisation.id))
+
+# the organisation a list counts towards while it is CREATED, or None if it isn't CREATED or no longer exists
+def counted_list_organisation(shopping_list_id):
+    shopping_list = ShoppingList.objects.select_related('organisation').filter(id=shopping_list_id).first()
+    if shopping_list is None or shopping_list.status != get_initial_status():
+        return None
+    return shopping_list.organisation
+
+# count a saved item, unless its list isn't CREATED or already has another item with the same name
+def add_item_demand(item):
+    organisation = counted_list_organisation(item.shopping_list_id)
+    if organisation is None:
+        return
+    if not ShoppingListItem.objects.filter(
+        shopping_list_id=item.shopping_list_id,
+        item_name=item.item_name
+    ).exclude(pk=item.pk).exists():
+        add_list_demand(organisation, [item.item_name])
+
+# stop counting an item name that was removed from a list, unless the list still has an item with that name
+def remove_item_demand(shopping_list_id, item_name):
+    organisation = counted_list_organisation(shopping_list_id)
+    if organisation is None:
+        return
+    if not ShoppingListItem.objects.filter(shopping_list_id=shopping_list_id, item_name=item_name).exists():
+        remove_list_demand(organisation, [item_name])
+
+# count or stop counting a saved list whose status moved into or out of CREATED from stored_status
+def change_list_status_demand(shopping_list, stored_status):
+    initial_status = get_initial_status()
+    if (stored_status == initial_status) == (shopping_list.status == initial_status) or shopping_list.organisation_id is None:
+        return
+    item_names = list(ShoppingListItem.objects.filter(shopping_list_id=shopping_list.id).values_list('item_name', flat=True))
+    if shopping_list.status == initial_status:
+        add_list_demand(shopping_list.organisation, item_names)
+    else:
+        remove_list_demand(shopping_list.organisation, item_names)
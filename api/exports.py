@@ -0,0 +1,102 @@
+import csv
+import json
+from datetime import datetime
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .models import Transaction, ShoppingList, ShoppingListItem
+
+"""
+    - Streaming CSV or NDJSON (one json object per line) exports of an organisation's data
+    - Rows are read from the database in chunks of EXPORT_CHUNK_SIZE with .iterator() and written out as they
+      are read, so an export uses the same memory however much history an organisation has
+    - Rows are read in the order of an index, so the database never sorts an organisation's whole history
+      before the first row is written
+"""
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# the content type of each export format
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+"""
+    - A file-like object that returns what is written to it, so csv.writer can build one line at a time
+"""
+class Echo:
+
+    def write(self, value):
+        return value
+
+# the json value of an exported field
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+# write rows of values out as lines of the export format, starting with a header line for csv
+def export_lines(columns, rows, export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(columns, [export_value(value) for value in row]))) + "\n"
+
+# parse the start or end of an export's date range, an ISO date or datetime in the current time zone
+def parse_export_date(value):
+    if not value:
+        return None
+    date = datetime.fromisoformat(value)
+    if settings.USE_TZ and timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+# limit a queryset to rows with a date field from start (inclusive) to end (exclusive)
+def filter_date_range(queryset, field, start=None, end=None):
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset
+
+# read the given columns of a queryset in chunks, in the given order
+def iter_columns(queryset, columns, ordering):
+    return queryset.order_by(*ordering).values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+# the columns and rows of every transaction of the organisation's users, a user at a time, oldest first
+def transaction_rows(organisation, start=None, end=None):
+    columns = ('id', 'user_id', 'username', 'transaction_datetime', 'transaction_amount', 'detail')
+    transactions = filter_date_range(
+        Transaction.objects.filter(user__userprofile__organisation=organisation).annotate(username=F('user__username')),
+        'transaction_datetime', start, end
+    )
+    # ordered by the profile's user, so the rows follow the organisation's (organisation, user) profile index
+    return columns, iter_columns(transactions, columns, ('user__userprofile__user', 'transaction_datetime', 'id'))
+
+# the columns and rows of every shopping list of the organisation's users, oldest first
+def shopping_list_rows(organisation, start=None, end=None):
+    columns = ('id', 'user_id', 'username', 'time_created', 'status', 'price', 'notes')
+    shopping_lists = filter_date_range(
+        ShoppingList.objects.filter(organisation=organisation).annotate(username=F('user__username')),
+        'time_created', start, end
+    )
+    return columns, iter_columns(shopping_lists, columns, ('time_created', 'id'))
+
+# the columns and rows of every item on the organisation's shopping lists, by the time their list was created
+def shopping_list_item_rows(organisation, start=None, end=None):
+    columns = ('id', 'shopping_list_id', 'item_name')
+    list_items = filter_date_range(
+        ShoppingListItem.objects.filter(shopping_list__organisation=organisation),
+        'shopping_list__time_created', start, end
+    )
+    return columns, iter_columns(list_items, columns, ('shopping_list__time_created', 'shopping_list_id', 'id'))
@@ -0,0 +1,302 @@
+import codecs
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+from .models import UserProfile, Transaction
+from .ledger import record_transactions
+
+"""
+    - Bulk imports from CSV or NDJSON (one json object per line) files
+    - Files are read a row at a time and processed in chunks of IMPORT_CHUNK_SIZE rows, so an import never
+      holds the whole file in memory
+    - Every row is checked and every error is reported with its line number. An import is all or nothing:
+      if any row has an error nothing is written, so the corrected file can be imported again as a whole.
+"""
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# work out the format of an import file from its name
+def guess_import_format(file_name):
+    if file_name.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+# decode the lines of an uploaded file as they are read
+def iter_upload_lines(upload):
+    return codecs.iterdecode(upload, 'utf-8-sig')
+
+# read the rows of an import file as (line number, row dictionary), from an iterable of text lines
+def read_rows(lines, import_format):
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {import_format}")
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # a line that isn't a json object is passed on as None, to be reported as an error
+        yield line_number, row if isinstance(row, dict) else None
+
+# split rows into lists of at most chunk_size rows
+def chunked(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# the report returned by an import, listing the errors in line order
+def import_report(rows, imported, errors):
+    return {
+        'rows': rows,
+        'imported': imported,
+        'errors': [{'line': line_number, 'error': error} for line_number, error in errors]
+    }
+
+# parse an amount that fits a Transaction, or None if it isn't one
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or abs(amount) >= 10000 or amount != amount.quantize(Decimal('0.01')):
+        return None
+    return amount
+
+# a row value with surrounding whitespace removed, or None if it is missing or blank
+def row_value(row, key):
+    value = row.get(key)
+    if isinstance(value, str):
+        value = value.strip()
+    return value if value not in (None, '') else None
+
+"""
+    - Import payments into the Transaction ledger
+    - With dry_run the file is only checked
+    - Each row has the user's user_id or username, the payment amount and optionally a date (ISO format) and
+      a detail, eg. user_id,payment,date
+    - Users are checked against the organisation once per chunk, and each chunk of payments is recorded with one
+      insert through api.ledger so the users' balances are updated with them
+"""
+def import_payments(organisation, rows, dry_run=False):
+    row_count = 0
+    valid = 0
+    errors = []
+    with transaction.atomic():
+        for chunk in chunked(rows):
+            row_count += len(chunk)
+            # find every user named in the chunk at the organisation in one query
+            user_ids = set()
+            usernames = set()
+            for line_number, row in chunk:
+                if row is None:
+                    continue
+                user_id = row_value(row, 'user_id')
+                if user_id is not None and str(user_id).isdigit():
+                    user_ids.add(int(user_id))
+                elif row_value(row, 'username') is not None:
+                    usernames.add(row_value(row, 'username'))
+            organisation_users = UserProfile.objects.filter(
+                Q(user_id__in=user_ids) | Q(user__username__in=usernames),
+                organisation=organisation
+            ).values_list('user_id', 'user__username')
+            ids_by_username = {username: user_id for user_id, username in organisation_users}
+            known_ids = set(ids_by_username.values())
+
+            transactions = []
+            for line_number, row in chunk:
+                if row is None:
+                    errors.append((line_number, "The line is not a json object."))
+                    continue
+                user_id = row_value(row, 'user_id')
+                username = row_value(row, 'username')
+                if user_id is not None:
+                    user_id = int(user_id) if str(user_id).isdigit() else None
+                    error = f"No user with id {row_value(row, 'user_id')} at your organisation."
+                elif username is not None:
+                    user_id = ids_by_username.get(username)
+                    error = f"No user with username {username} at your organisation."
+                else:
+                    errors.append((line_number, "A user_id or username is required."))
+                    continue
+                if user_id not in known_ids:
+                    errors.append((line_number, error))
+                    continue
+
+                payment = parse_amount(row_value(row, 'payment'))
+                if payment is None:
+                    errors.append((line_number, f"Invalid payment: {row.get('payment')}"))
+                    continue
+
+                date = row_value(row, 'date')
+                try:
+                    transaction_datetime = datetime.fromisoformat(date) if date else datetime.now()
+                except (TypeError, ValueError):
+                    errors.append((line_number, f"Invalid date: {date}"))
+                    continue
+
+                detail = row_value(row, 'detail') or "Payment made."
+                if len(detail) > Transaction._meta.get_field('detail').max_length:
+                    errors.append((line_number, "The detail is too long."))
+                    continue
+
+                transactions.append(Transaction(
+                    user_id=user_id,
+                    transaction_amount=-payment,
+                    transaction_datetime=transaction_datetime,
+                    detail=detail
+                ))
+
+            if not errors and not dry_run:
+                record_transactions(transactions)
+            valid += len(transactions)
+
+        written = not (errors or dry_run)
+        if not written:
+            # leave the ledger as it was before the import
+            transaction.set_rollback(True)
+    return import_report(row_count, valid if written else 0, errors)
+
+# hash a password with the given hasher
+def hash_password(hasher, password):
+    return hasher.encode(password, hasher.salt())
+
+"""
+    - Hashes passwords with the default password hasher, in parallel on a pool of threads
+    - Hashing is deliberately slow, so bulk imports spread it over every core. Django's hashers spend their time
+      in C code that releases the GIL, so threads run in parallel without forking the web process.
+    - The threads are started on first use and shared by every import in the process. A single password is
+      hashed on the calling thread.
+"""
+class PasswordHasherPool:
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = None
+
+    # start the pool's threads, once per process
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                workers = self.workers or settings.PASSWORD_HASHING_WORKERS or os.cpu_count() or 1
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-password-hasher')
+            return self.executor
+
+    def hash(self, passwords):
+        hasher = get_hasher('default')
+        if len(passwords) < 2:
+            return [hash_password(hasher, password) for password in passwords]
+        return list(self.start().map(lambda password: hash_password(hasher, password), passwords))
+
+# the pool bulk imports hash passwords on
+default_hasher_pool = PasswordHasherPool()
+
+USER_TYPES = ('user', 'admin')
+
+# check a user row, returning an error message or None
+def user_row_error(row):
+    username = row_value(row, 'username')
+    email = row_value(row, 'email')
+    if username is None or email is None or row_value(row, 'password') is None:
+        return "A username, email and password are required."
+    try:
+        User._meta.get_field('username').run_validators(username)
+        validate_email(email)
+    except ValidationError as e:
+        return " ".join(e.messages)
+    if (row_value(row, 'user_type') or 'user') not in USER_TYPES:
+        return f"Invalid user_type: {row_value(row, 'user_type')}"
+    return None
+
+"""
+    - Import users into an organisation, with their profiles and api tokens
+    - With dry_run the file is only checked, and no passwords are hashed
+    - Each row has a username, email, password and optionally a user_type (user or admin, by default user)
+    - Usernames already taken, or repeated in the file, are reported as conflicts
+    - Passwords are hashed on the shared PasswordHasherPool, and each chunk of users, profiles and tokens is saved with
+      one insert each. Bulk inserts don't send the post_save signal that creates a token for a new user, so the
+      tokens are created here.
+"""
+def import_users(organisation, rows, dry_run=False):
+    row_count = 0
+    valid = 0
+    errors = []
+    seen_usernames = set()
+    with transaction.atomic():
+        for chunk in chunked(rows):
+            row_count += len(chunk)
+            # find the usernames in the chunk that are already taken in one query
+            usernames = {row_value(row, 'username') for line_number, row in chunk if row is not None}
+            taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+            new_rows = []
+            for line_number, row in chunk:
+                if row is None:
+                    errors.append((line_number, "The line is not a json object."))
+                    continue
+                error = user_row_error(row)
+                username = row_value(row, 'username')
+                if error is None and username in taken_usernames:
+                    error = f"The username {username} is already taken."
+                elif error is None and username in seen_usernames:
+                    error = f"The username {username} appears more than once."
+                if error is not None:
+                    errors.append((line_number, error))
+                    continue
+                seen_usernames.add(username)
+                new_rows.append(row)
+            valid += len(new_rows)
+
+            if errors or dry_run:
+                # keep checking the rest of the file, but don't spend time hashing passwords
+                continue
+
+            passwords = default_hasher_pool.hash([row_value(row, 'password') for row in new_rows])
+            users = [
+                User(username=row_value(row, 'username'), email=row_value(row, 'email'), password=password)
+                for row, password in zip(new_rows, passwords)
+            ]
+            User.objects.bulk_create(users)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                # read the new user ids back where the database doesn't return them from the insert
+                user_ids = dict(User.objects.filter(
+                    username__in=[new_user.username for new_user in users]
+                ).values_list('username', 'id'))
+                for new_user in users:
+                    new_user.id = user_ids[new_user.username]
+
+            UserProfile.objects.bulk_create([
+                UserProfile(user_id=new_user.id, organisation=organisation, user_type=row_value(row, 'user_type') or 'user')
+                for row, new_user in zip(new_rows, users)
+            ])
+            Token.objects.bulk_create([Token(key=Token.generate_key(), user_id=new_user.id) for new_user in users])
+
+        written = not (errors or dry_run)
+        if not written:
+            # leave the users as they were before the import
+            transaction.set_rollback(True)
+    return import_report(row_count, valid if written else 0, errors)
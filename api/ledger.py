@@ -0,0 +1,67 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Case, F, Q, OuterRef, Subquery, Sum, Value, When, DecimalField
+from django.db.models.functions import Coalesce
+from django.db.transaction import atomic
+from .models import UserProfile, Transaction
+from .versions import bump_user_lists_versions
+
+"""
+    - Writes to the Transaction ledger
+    - Every user's profile stores the sum of their transactions as their balance. Transactions must be
+      recorded through this module so the balance is updated in the same database transaction.
+    - reconcile_balances detects and repairs any drift between the stored balances and the ledger
+"""
+
+# the precision of every amount in the ledger and of the stored balances
+CENT = Decimal('0.01')
+
+# record transactions and add their amounts to the users' stored balances
+def record_transactions(transactions):
+    totals = defaultdict(Decimal)
+    for transaction in transactions:
+        if transaction.transaction_amount is not None:
+            # round the amount the way the database stores it, so the balance gets exactly what the ledger holds
+            transaction.transaction_amount = Decimal(str(transaction.transaction_amount)).quantize(CENT)
+        totals[transaction.user_id] += transaction.transaction_amount or 0
+    with atomic():
+        Transaction.objects.bulk_create(transactions)
+        if totals:
+            # add every user's total to their balance in one update
+            UserProfile.objects.filter(user_id__in=totals.keys()).update(balance=F('balance') + Case(
+                *[When(user_id=user_id, then=Value(total)) for user_id, total in totals.items()],
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            ))
+        bump_user_lists_versions(totals.keys())
+
+# record a single transaction and add its amount to the user's stored balance
+def record_transaction(transaction):
+    record_transactions([transaction])
+
+# the balance of each user according to the ledger, as a subquery on the user id
+def ledger_balance(user_id_field='user_id'):
+    totals = Transaction.objects.filter(
+        user_id=OuterRef(user_id_field)
+    ).order_by().values('user_id').annotate(total=Sum('transaction_amount')).values('total')
+    return Coalesce(Subquery(totals), Value(0), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+# find the profiles whose stored balance differs from the ledger
+def find_balance_drift(user_profiles=None):
+    if user_profiles is None:
+        user_profiles = UserProfile.objects.all()
+    # sqlite sums decimals as floats, so ignore differences smaller than half a cent
+    return user_profiles.annotate(
+        ledger_balance=ledger_balance(),
+        drift=F('balance') - F('ledger_balance')
+    ).filter(
+        Q(drift__gt=Decimal('0.005')) | Q(drift__lt=Decimal('-0.005'))
+    ).select_related('user').order_by('id')
+
+# set the stored balance of the given profiles to the ledger balance
+def reconcile_balances(user_profiles):
+    with atomic():
+        reconciled = UserProfile.objects.filter(
+            id__in=[user_profile.id for user_profile in user_profiles]
+        ).update(balance=ledger_balance())
+        bump_user_lists_versions([user_profile.user_id for user_profile in user_profiles])
+    return reconciled
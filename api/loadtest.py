@@ -0,0 +1,334 @@
+import json
+import random
+import re
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+from .models import ListStatus
+
+"""
+    - A load generator for a running server, using only the standard library
+    - Worker threads replay weighted scenarios, each a short sequence of requests made by one of the users of the
+      stand-in data, eg. a user building a list or an admin settling one
+    - Every request is timed and recorded under its route, and the run is reported as json with the throughput,
+      p50/p95/p99 latency and error rate of each route, so runs against different builds can be compared
+"""
+
+LOAD_TEST_TIMEOUT = 30
+PERCENTILES = (50, 95, 99)
+
+"""
+    - A user of the stand-in data that scenarios make requests as
+    - Requests to the api are authenticated with the user's token. The dashboard needs a session, so the first
+      dashboard request logs the user in, and later requests reuse the session cookie.
+"""
+class Actor:
+
+    def __init__(self, username, password, token, user_type):
+        self.username = username
+        self.password = password
+        self.token = token
+        self.user_type = user_type
+        self.session = None
+        self.lock = threading.Lock()
+
+    def is_admin(self):
+        return self.user_type == 'admin'
+
+# load the users the load test makes requests as, from the organisations with names starting with prefix
+def load_actors(prefix, password, organisations=None):
+    tokens = Token.objects.filter(
+        user__userprofile__organisation__organisation_name__startswith=prefix
+    ).order_by('user__userprofile__organisation_id', 'user_id').values_list(
+        'key', 'user__username', 'user__userprofile__user_type', 'user__userprofile__organisation_id'
+    )
+    actors = []
+    organisation_ids = set()
+    for key, username, user_type, organisation_id in tokens:
+        if organisations is not None and organisation_id not in organisation_ids and len(organisation_ids) == organisations:
+            continue
+        organisation_ids.add(organisation_id)
+        actors.append(Actor(username, password, key, user_type))
+    return actors
+
+"""
+    - Collects the latency and outcome of every request, by route, from every worker thread
+"""
+class Recorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, route, seconds, status_code):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            route_statuses = self.statuses.setdefault(route, {})
+            route_statuses[status_code] = route_statuses.get(status_code, 0) + 1
+
+# the value below which the given percentage of the sorted values fall, by the nearest rank
+def percentile(sorted_values, percentage):
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percentage // 100))
+    return sorted_values[int(rank) - 1]
+
+# a failed request: a status code of 400 or above, or 0 when no response was received
+def is_error(status_code):
+    return status_code == 0 or status_code >= 400
+
+# summarise the latencies and statuses of one route, with latencies in milliseconds
+def route_report(latencies, statuses, duration):
+    latencies = sorted(latencies)
+    errors = sum(count for status_code, count in statuses.items() if is_error(status_code))
+    report = {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4) if latencies else 0,
+        'throughput': round(len(latencies) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            'max': round(latencies[-1] * 1000, 2) if latencies else None,
+        },
+        'status_codes': {str(status_code): count for status_code, count in sorted(statuses.items())},
+    }
+    for percentage in PERCENTILES:
+        value = percentile(latencies, percentage)
+        report['latency_ms'][f'p{percentage}'] = round(value * 1000, 2) if value is not None else None
+    return report
+
+"""
+    - Makes the requests of a scenario, timing each one and recording it under its route
+"""
+class Client:
+
+    def __init__(self, base_url, recorder, timeout=LOAD_TEST_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = build_opener()
+
+    # make a request, returning (status code, body). The status code is 0 when no response was received.
+    def request(self, route, path, actor=None, data=None, method='POST', session=False, form=False, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if data is not None and form:
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if actor is not None and not session:
+            headers['Authorization'] = f"Token {actor.token}"
+        opener = actor.session if session else self.opener
+        request = Request(self.base_url + path, data=body, headers=headers, method=method)
+
+        started = time.perf_counter()
+        try:
+            with opener.open(request, timeout=self.timeout) as response:
+                status_code = response.status
+                content = response.read()
+        except HTTPError as e:
+            status_code = e.code
+            content = e.read()
+        except (URLError, OSError):
+            status_code = 0
+            content = b''
+        self.recorder.record(route, time.perf_counter() - started, status_code)
+        return status_code, content
+
+    # a json response body, or None
+    def request_json(self, *args, **kwargs):
+        status_code, content = self.request(*args, **kwargs)
+        if is_error(status_code):
+            return None
+        try:
+            return json.loads(content)
+        except ValueError:
+            return None
+
+    # log an actor in to the dashboard once, keeping the session cookie for their later dashboard requests
+    def login(self, actor):
+        with actor.lock:
+            if actor.session is not None:
+                return True
+            cookies = CookieJar()
+            actor.session = build_opener(HTTPCookieProcessor(cookies))
+            status_code, content = self.request('login', '/login/', actor, method='GET', session=True)
+            match = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', content)
+            if match is None:
+                actor.session = None
+                return False
+            csrf_token = match.group(1).decode()
+            status_code, content = self.request(
+                'login',
+                '/login/',
+                actor,
+                data={'username': actor.username, 'password': actor.password, 'csrfmiddlewaretoken': csrf_token},
+                session=True,
+                form=True,
+                headers={'Referer': self.base_url + '/login/'}
+            )
+            # a failed login shows the login page again, without starting a session
+            if is_error(status_code) or not any(cookie.name == settings.SESSION_COOKIE_NAME for cookie in cookies):
+                actor.session = None
+                return False
+            return True
+
+# a user reads the items they can choose from and creates a list from a few of them
+def build_list(client, actor, rng, context):
+    options = client.request_json('api-get-shopping-list-items', '/api/get-shopping-list-items/', actor, {})
+    if not options:
+        return
+    groups = rng.sample(sorted(options), min(len(options), rng.randint(1, 3)))
+    form_data = {
+        group: [item['item_name'] for item in rng.sample(options[group], min(len(options[group]), rng.randint(1, 3)))]
+        for group in groups
+    }
+    client.request('api-create-new-list', '/api/create-new-list/', actor, {'form_data': form_data})
+
+# an admin polls the generated shopping list of every open list
+def poll_generate_list(client, actor, rng, context):
+    client.request('api-generate-list', '/api/generate-list/', actor, {'group_items': True})
+
+# an admin reads the newest lists and moves one of them on to its next status, setting its price
+def settle_list(client, actor, rng, context):
+    content = client.request_json('api-get-lists', '/api/get-lists/', actor, {})
+    if not content:
+        return
+    statuses = context['statuses']
+    open_lists = [
+        shopping_list
+        for user_lists in content['lists'].values()
+        for shopping_list in user_lists
+        if shopping_list['list_status'] in statuses[:-1]
+    ]
+    if not open_lists:
+        return
+    shopping_list = rng.choice(open_lists)
+    client.request('api-update-list', '/api/update-list/', actor, {
+        'list_id': shopping_list['list_id'],
+        'price': f"{rng.randint(500, 15000) / 100:.2f}",
+        'status': statuses[statuses.index(shopping_list['list_status']) + 1],
+        'notes': "Settled by the load test."
+    })
+
+# an admin reads the balance and history of one of the users at their organisation
+def view_user(client, actor, rng, context):
+    content = client.request_json('api-get-all-users', '/api/get-all-users/', actor, method='GET')
+    if not content:
+        return
+    user_ids = [profile['auth_info']['user_id'] for profile in content['user_profiles']]
+    if user_ids:
+        client.request('api-user-detail', '/api/user-detail/', actor, {'user_id': rng.choice(user_ids)})
+
+# a user logged in to the dashboard views their lists
+def dashboard_lists(client, actor, rng, context):
+    if client.login(actor):
+        client.request('dashboard-view-lists', '/dashboard/lists/', actor, method='GET', session=True)
+
+# an admin logged in to the dashboard views the generated shopping list
+def dashboard_generate_list(client, actor, rng, context):
+    if client.login(actor):
+        client.request('dashboard-generate-list', '/dashboard/generate-list/', actor, method='GET', session=True)
+
+# every scenario: (function, whether it is run by admins or users, default weight)
+SCENARIOS = {
+    'build-list': (build_list, 'user', 5),
+    'poll-generate-list': (poll_generate_list, 'admin', 3),
+    'settle-list': (settle_list, 'admin', 2),
+    'view-user': (view_user, 'admin', 1),
+    'dashboard-lists': (dashboard_lists, 'user', 1),
+    'dashboard-generate-list': (dashboard_generate_list, 'admin', 1),
+}
+
+# parse scenario weights from "name=weight" strings, starting from the default weights
+def parse_weights(values):
+    weights = {name: weight for name, (function, role, weight) in SCENARIOS.items()}
+    for value in values or []:
+        name, separator, weight = value.partition('=')
+        if name not in SCENARIOS or not separator or not weight.isdigit():
+            raise ValueError(f"Invalid scenario weight: {value}. Use name=weight, with a name from {', '.join(SCENARIOS)}.")
+        weights[name] = int(weight)
+    if not any(weights.values()):
+        raise ValueError("At least one scenario needs a weight above 0.")
+    return weights
+
+"""
+    - Run the load test: concurrency worker threads each pick a weighted scenario and a random actor with the
+      scenario's role, run it, and repeat until duration seconds have passed or max_scenarios scenarios have run
+    - A duration of 0 runs without a time limit, so it needs a max_scenarios
+    - Each worker has its own random.Random, seeded from seed, so the sequence of scenarios is repeatable
+    - Returns the json report
+"""
+def run_load_test(base_url, actors, weights, concurrency=10, duration=60, max_scenarios=None, seed=0):
+    if max_scenarios is not None and max_scenarios < 1:
+        raise ValueError("At least one scenario has to run.")
+    if duration <= 0 and max_scenarios is None:
+        raise ValueError("A load test without a duration needs a number of scenarios to stop after.")
+    admins = [actor for actor in actors if actor.is_admin()]
+    users = [actor for actor in actors if not actor.is_admin()]
+    # scenarios can only run if there are actors with their role
+    weights = {
+        name: weight for name, weight in weights.items()
+        if weight and (admins if SCENARIOS[name][1] == 'admin' else users)
+    }
+    if not weights:
+        raise ValueError("No actors can run the weighted scenarios.")
+    names = sorted(weights)
+    context = {'statuses': list(ListStatus.objects.order_by('rank').values_list('label', flat=True))}
+
+    recorder = Recorder()
+    scenario_counts = {name: 0 for name in names}
+    counts_lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration if duration > 0 else None
+
+    def claim(name):
+        with counts_lock:
+            if max_scenarios is not None and sum(scenario_counts.values()) >= max_scenarios:
+                return False
+            scenario_counts[name] += 1
+            return True
+
+    def work(worker_number):
+        rng = random.Random(f"{seed}-{worker_number}")
+        client = Client(base_url, recorder)
+        while deadline is None or time.perf_counter() < deadline:
+            name = rng.choices(names, weights=[weights[name] for name in names])[0]
+            if not claim(name):
+                return
+            function, role, default_weight = SCENARIOS[name]
+            function(client, rng.choice(admins if role == 'admin' else users), rng, context)
+
+    workers = [threading.Thread(target=work, args=(worker_number,), daemon=True) for worker_number in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [seconds for latencies in recorder.latencies.values() for seconds in latencies]
+    all_statuses = {}
+    for statuses in recorder.statuses.values():
+        for status_code, count in statuses.items():
+            all_statuses[status_code] = all_statuses.get(status_code, 0) + count
+    return {
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'seed': seed,
+        'weights': weights,
+        'duration': round(elapsed, 3),
+        'scenarios': scenario_counts,
+        'total': route_report(all_latencies, all_statuses, elapsed),
+        'routes': {
+            route: route_report(latencies, recorder.statuses[route], elapsed)
+            for route, latencies in sorted(recorder.latencies.items())
+        },
+    }
@@ -0,0 +1,71 @@
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Organisation
+from api.synthetic import SYNTHETIC_PASSWORD, generate_synthetic_data, dump_sqlite
+
+"""
+    - Fill the database with deterministic synthetic organisations, users, lists and transactions
+    - The same --seed and sizes always generate the same rows, written with bulk inserts. Api token keys are
+      random.
+    - Every user can log in with --password, so the command refuses to run with DEBUG off or on a database
+      that already has organisations or users, unless --force is given
+    - With --dump the database is then copied to a SQLite file, which benchmark runs can start from instead of
+      generating the data again
+"""
+class Command(BaseCommand):
+    help = "Generate deterministic synthetic organisations with users, shopping lists and transaction histories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="The random seed. The same seed generates the same data.")
+        parser.add_argument('--organisations', type=int, default=100, help="The number of organisations to generate.")
+        parser.add_argument('--users', type=int, default=20, help="The average number of users in an organisation.")
+        parser.add_argument('--lists', type=int, default=50, help="The average number of shopping lists of a user.")
+        parser.add_argument('--items', type=int, default=5, help="The average number of items on a shopping list.")
+        parser.add_argument('--payments', type=int, default=20, help="The average number of payments made by a user.")
+        parser.add_argument('--days', type=int, default=365, help="The number of days the lists and transactions are spread over.")
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help="The prefix of the generated organisation names and usernames."
+        )
+        parser.add_argument('--password', default=SYNTHETIC_PASSWORD, help="The password every generated user logs in with.")
+        parser.add_argument('--dump', metavar='PATH', help="Copy the database to a SQLite file at PATH afterwards.")
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Generate the data even with DEBUG off or on a database that already has organisations or users."
+        )
+
+    def handle(self, *args, **options):
+        for option in ('organisations', 'users', 'lists', 'items', 'payments', 'days'):
+            if options[option] < 0 or (option in ('organisations', 'users', 'days') and options[option] == 0):
+                raise CommandError(f"--{option} is too small.")
+        if not options['force']:
+            if not settings.DEBUG:
+                raise CommandError("DEBUG is off, so this may be a production database. Use --force to generate the data anyway.")
+            if Organisation.objects.exists() or User.objects.exists():
+                raise CommandError("The database already has organisations or users. Use --force to generate the data anyway.")
+        if Organisation.objects.filter(organisation_name__startswith=f"{options['prefix']} organisation ").exists():
+            raise CommandError(f"Synthetic organisations with the prefix \"{options['prefix']}\" already exist. Use another --prefix.")
+
+        started = time.monotonic()
+
+        def progress(number, counts):
+            if options['verbosity'] > 1 or number % 10 == 0 or number == options['organisations']:
+                self.stdout.write(f"{number}/{options['organisations']} organisations")
+
+        totals = generate_synthetic_data(options, progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['organisations']} organisation(s), {totals['users']} user(s), {totals['lists']} list(s), "
+            f"{totals['list_items']} list item(s) and {totals['transactions']} transaction(s) "
+            f"in {time.monotonic() - started:.1f}s. Every user's password is \"{options['password']}\"."
+        ))
+
+        if options['dump']:
+            try:
+                dump_sqlite(options['dump'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"Copied the database to {options['dump']}."))
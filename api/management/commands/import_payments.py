@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Organisation
+from api.imports import IMPORT_FORMATS, guess_import_format, read_rows, import_payments
+
+"""
+    - Import a CSV or NDJSON file of payments into an organisation's Transaction ledger
+    - The file is read a row at a time. If any row has an error nothing is imported.
+"""
+class Command(BaseCommand):
+    help = "Import a CSV or NDJSON file of payments (user_id or username, payment, date, detail) for an organisation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('organisation', help="The name of the organisation the payments belong to.")
+        parser.add_argument('path', help="The file to import.")
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help="The format of the file. By default it is worked out from the file name."
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Check the file without importing it."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            organisation = Organisation.objects.get(organisation_name=options['organisation'])
+        except Organisation.DoesNotExist:
+            raise CommandError(f"Organisation \"{options['organisation']}\" does not exist.")
+
+        import_format = options['format'] or guess_import_format(options['path'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as import_file:
+            report = import_payments(organisation, read_rows(import_file, import_format), dry_run=options['dry_run'])
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if report['errors']:
+            raise CommandError(f"{len(report['errors'])} of {report['rows']} row(s) have errors. Nothing was imported.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"All {report['rows']} row(s) are valid."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {report['imported']} payment(s)."))
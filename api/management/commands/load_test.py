@@ -0,0 +1,79 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.loadtest import SCENARIOS, load_actors, parse_weights, run_load_test
+from api.synthetic import SYNTHETIC_PASSWORD
+
+"""
+    - Load test a running server with weighted scenarios, as the users of the stand-in data
+    - Reads the users and their tokens from this project's database, so run it with the same settings as the
+      server, eg. against a local server on data made by generate_synthetic_data
+    - Writes the json report to stdout, or to --output
+"""
+class Command(BaseCommand):
+    help = "Replay weighted api and dashboard scenarios against a running server and report latency and errors per route as json."
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', nargs='?', default='http://127.0.0.1:8000', help="The server to load test.")
+        parser.add_argument('--concurrency', type=int, default=10, help="The number of scenarios run at once.")
+        parser.add_argument('--duration', type=float, default=60, help="How long to run for, in seconds. 0 runs until --scenarios have run.")
+        parser.add_argument('--scenarios', type=int, help="Stop after this many scenarios, even if --duration hasn't passed.")
+        parser.add_argument(
+            '--weight',
+            action='append',
+            metavar='NAME=WEIGHT',
+            help=f"Change the weight of a scenario. Can be repeated. Scenarios: {', '.join(SCENARIOS)}."
+        )
+        parser.add_argument('--seed', type=int, default=0, help="The random seed of the scenario choices.")
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help="Make requests as the users of organisations with names starting with this prefix."
+        )
+        parser.add_argument('--organisations', type=int, help="Only use the users of this many organisations.")
+        parser.add_argument(
+            '--password',
+            default=SYNTHETIC_PASSWORD,
+            help="The users' password, used to log in to the dashboard."
+        )
+        parser.add_argument('--output', help="Write the report to this file.")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        if options['scenarios'] is not None and options['scenarios'] < 1:
+            raise CommandError("--scenarios must be at least 1.")
+        if options['duration'] <= 0 and options['scenarios'] is None:
+            raise CommandError("--duration must be above 0, unless --scenarios is given.")
+        try:
+            weights = parse_weights(options['weight'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        actors = load_actors(options['prefix'], options['password'], options['organisations'])
+        if not actors:
+            raise CommandError(f"No users with api tokens at organisations starting with \"{options['prefix']}\".")
+
+        try:
+            report = run_load_test(
+                options['base_url'],
+                actors,
+                weights,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                max_scenarios=options['scenarios'],
+                seed=options['seed']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + "\n")
+            total = report['total']
+            self.stdout.write(self.style.SUCCESS(
+                f"{total['requests']} request(s) at {total['throughput']}/s, {total['errors']} error(s). "
+                f"Report written to {options['output']}."
+            ))
+        else:
+            self.stdout.write(output)
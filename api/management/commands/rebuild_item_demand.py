@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Organisation
+from api.demand import diff_item_demand, rebuild_item_demand
+
+"""
+    - Rebuild the stored per-organisation item demand from the shopping lists and verify it
+    - With --check, only compare the stored demand with a full recompute and fail if they differ
+"""
+class Command(BaseCommand):
+    help = "Rebuild the generated shopping list demand table from scratch and verify it against a full recompute."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organisation',
+            help="Only rebuild the demand for the organisation with this name."
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Verify the stored demand without rebuilding it."
+        )
+
+    def handle(self, *args, **options):
+        organisations = Organisation.objects.order_by('id')
+        if options['organisation']:
+            organisations = organisations.filter(organisation_name=options['organisation'])
+            if not organisations.exists():
+                raise CommandError(f"Organisation \"{options['organisation']}\" does not exist.")
+
+        drifted = 0
+        for organisation in organisations:
+            if not options['check']:
+                rebuild_item_demand(organisation)
+            differences = diff_item_demand(organisation)
+            if differences:
+                drifted += 1
+                for item_name, (stored, expected) in sorted(differences.items()):
+                    self.stderr.write(f"{organisation}: {item_name} stored {stored}, expected {expected}")
+
+        if drifted:
+            raise CommandError(f"Item demand differs from a full recompute for {drifted} organisation(s).")
+        self.stdout.write(self.style.SUCCESS("Item demand matches a full recompute."))
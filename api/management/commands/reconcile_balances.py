@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.ledger import find_balance_drift, reconcile_balances
+
+"""
+    - Compare every user's stored balance with the sum of their transactions
+    - With --fix, reset drifted balances to the ledger balance
+"""
+class Command(BaseCommand):
+    help = "Detect, and optionally repair, stored account balances that differ from the Transaction ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help="Reset drifted balances to the sum of the user's transactions."
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(find_balance_drift())
+        for user_profile in drifted:
+            self.stderr.write(
+                f"{user_profile.user}: stored balance {user_profile.balance}, ledger balance {user_profile.ledger_balance}"
+            )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All balances match the ledger."))
+        elif options['fix']:
+            fixed = reconcile_balances(drifted)
+            self.stdout.write(self.style.SUCCESS(f"Reconciled {fixed} balance(s) with the ledger."))
+        else:
+            raise CommandError(f"{len(drifted)} balance(s) differ from the ledger. Run with --fix to repair them.")
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.4 on 2026-10-18 06:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def populate_item_demand(apps, schema_editor):
+    ListStatus = apps.get_model('api', 'ListStatus')
+    ShoppingListItem = apps.get_model('api', 'ShoppingListItem')
+    OrganisationItemDemand = apps.get_model('api', 'OrganisationItemDemand')
+    initial_status = ListStatus.objects.filter(rank=0).first()
+    if initial_status is None:
+        return
+    rows = ShoppingListItem.objects.filter(
+        shopping_list__status=initial_status.label,
+        shopping_list__user__userprofile__isnull=False
+    ).values(
+        'shopping_list__user__userprofile__organisation', 'item_name'
+    ).annotate(list_count=Count('shopping_list', distinct=True))
+    OrganisationItemDemand.objects.bulk_create([
+        OrganisationItemDemand(
+            organisation_id=row['shopping_list__user__userprofile__organisation'],
+            item_name=row['item_name'],
+            list_count=row['list_count']
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_auto_20210126_2236'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganisationItemDemand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=100)),
+                ('list_count', models.IntegerField(default=0)),
+                ('organisation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.organisation')),
+            ],
+            options={
+                'unique_together': {('organisation', 'item_name')},
+            },
+        ),
+        migrations.RunPython(populate_item_demand, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.4 on 2026-10-18 06:49
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_balances(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    UserProfile = apps.get_model('api', 'UserProfile')
+    totals = Transaction.objects.values('user_id').annotate(total=Sum('transaction_amount'))
+    for row in totals:
+        UserProfile.objects.filter(user_id=row['user_id']).update(balance=row['total'] or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_organisationitemdemand'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.4 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_versionstamp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='liststatus',
+            name='label',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='liststatus',
+            name='rank',
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='organisationcustomlistoption',
+            index=models.Index(fields=['organisation', 'group'], name='orgoption_org_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organisationcustomlistoption',
+            index=models.Index(fields=['organisation', 'item_name'], name='orgoption_org_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['status'], name='shoppinglist_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', '-time_created'], name='shoppinglist_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-transaction_datetime'], name='transaction_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.4 on 2026-10-18 08:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def populate_list_organisations(apps, schema_editor):
+    ShoppingList = apps.get_model('api', 'ShoppingList')
+    UserProfile = apps.get_model('api', 'UserProfile')
+    ShoppingList.objects.update(organisation_id=Subquery(
+        UserProfile.objects.filter(user_id=OuterRef('user_id')).values('organisation_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='organisation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='api.organisation'),
+        ),
+        migrations.RunPython(populate_list_organisations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['organisation', '-time_created', '-id'], name='shoppinglist_org_time_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.4 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_shoppinglist_organisation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['organisation', 'user'], name='userprofile_org_user_idx'),
+        ),
+    ]
@@ -22,6 +22,13 @@ class UserProfile(models.Model):
     organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE)
     user_type = models.CharField(max_length=10)
     is_first_login = models.BooleanField(default=True)
+    # the sum of the user's transactions, kept up to date by api.ledger
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organisation', 'user'], name='userprofile_org_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.organisation}"
@@ -30,19 +37,37 @@ class UserProfile(models.Model):
         return self.user_type == 'admin'
 
 class ListStatus(models.Model):
-    label = models.CharField(max_length=50)
-    rank = models.IntegerField()
+    label = models.CharField(max_length=50, unique=True)
+    rank = models.IntegerField(db_index=True)
 
     def __str__(self):
         return f"{self.rank} - {self.label}"
 
 class ShoppingList(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # the organisation of the list's user, stored on the list so an organisation's lists can be read in order
+    # from one index. api.signals fills it in from the user's profile and moves it when the profile's organisation
+    # changes. Empty for the lists of a user without a profile, eg. a superuser.
+    organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE, null=True)
     status = models.CharField(max_length=50)
     price = models.DecimalField(max_digits=6, decimal_places=2, null=True)
     time_created = models.DateTimeField()
     notes = models.TextField(null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='shoppinglist_status_idx'),
+            models.Index(fields=['user', '-time_created'], name='shoppinglist_user_time_idx'),
+            models.Index(fields=['organisation', '-time_created', '-id'], name='shoppinglist_org_time_idx'),
+        ]
+
+    # remember the status a list was loaded with, so a save can tell whether it moved status without reading it again
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        shopping_list = super().from_db(db, field_names, values)
+        shopping_list._loaded_status = shopping_list.__dict__.get('status')
+        return shopping_list
+
     def __str__(self):
         return f"{self.user}'s List: {self.id}"
 
@@ -74,6 +99,12 @@ class OrganisationCustomListOption(models.Model):
     group = models.ForeignKey(OrganisationCustomListGroup, on_delete=models.CASCADE, null=True)
     price = models.DecimalField(max_digits=6, decimal_places=2, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['organisation', 'group'], name='orgoption_org_group_idx'),
+            models.Index(fields=['organisation', 'item_name'], name='orgoption_org_item_idx'),
+        ]
+
     def __str__(self):
         return f"{self.item_name} - {self.organisation}"
 
@@ -83,5 +114,28 @@ class Transaction(models.Model):
     transaction_amount = models.DecimalField(max_digits=6, decimal_places=2, null=True)
     detail = models.CharField(max_length=150)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-transaction_datetime'], name='transaction_user_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.transaction_amount} - {self.transaction_datetime}"
+
+class OrganisationItemDemand(models.Model):
+    organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE)
+    item_name = models.CharField(max_length=100)
+    list_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('organisation', 'item_name')
+
+    def __str__(self):
+        return f"{self.item_name} x {self.list_count} - {self.organisation}"
+
+class VersionStamp(models.Model):
+    scope = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+
     def __str__(self):
-        return f"{self.user} - {self.transaction_amount} - {self.transaction_datetime}"
\ No newline at end of file
+        return f"{self.scope} - {self.version}"
@@ -0,0 +1,55 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.utils.dateparse import parse_datetime
+
+"""
+    - Helpers for keyset (cursor) pagination
+    - A cursor is an opaque, url safe encoding of the ordering values of the last row on a page,
+      so the next page can be read with an indexed range filter instead of an offset
+"""
+
+# the number of rows returned per page when a request doesn't ask for a page size
+DEFAULT_PAGE_SIZE = 50
+# the largest page size a request can ask for
+MAX_PAGE_SIZE = 500
+
+# get the page size requested in the request data, bounded by MAX_PAGE_SIZE
+def get_page_size(data, default=DEFAULT_PAGE_SIZE):
+    page_size = int(data.get('page_size') or default)
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+# encode the ordering values of a row as a cursor
+def encode_cursor(*values):
+    raw = "|".join(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values)
+    return urlsafe_b64encode(raw.encode()).decode()
+
+# the error raised for a cursor that wasn't made by encode_cursor, eg. one edited by hand
+def invalid_cursor(cursor):
+    return ValueError(f"Invalid cursor: {cursor}")
+
+# decode a cursor into its ordering values as strings, raising ValueError if it isn't a cursor
+def decode_cursor(cursor):
+    try:
+        return urlsafe_b64decode(cursor.encode()).decode().split("|")
+    except ValueError:
+        raise invalid_cursor(cursor)
+
+# decode a cursor made from a datetime and a key, by default an id, raising ValueError if it isn't one
+def decode_datetime_cursor(cursor, key=int):
+    try:
+        timestamp, value = decode_cursor(cursor)
+        time = parse_datetime(timestamp)
+        value = key(value)
+    except ValueError:
+        raise invalid_cursor(cursor)
+    if time is None:
+        raise invalid_cursor(cursor)
+    return time, value
+
+# split one more row than the page size into the page and the cursor for the next page
+def paginate(rows, page_size, cursor_values):
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(*cursor_values(rows[-1]))
+    return rows, next_cursor
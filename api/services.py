@@ -0,0 +1,1237 @@
+from django.db import IntegrityError, connection
+from django.db.models import Q
+from django.db.transaction import atomic
+from django.conf import settings
+from django.urls import reverse, resolve, Resolver404
+from django.contrib.auth.models import User
+from django.forms.models import model_to_dict
+from rest_framework import status
+from decimal import Decimal
+from .models import (
+    Organisation,
+    UserProfile,
+    OrganisationCustomListGroup,
+    OrganisationCustomListOption,
+    UserCustomListOption,
+    ShoppingList,
+    ShoppingListItem,
+    Transaction
+)
+from .pagination import get_page_size, decode_cursor, decode_datetime_cursor, paginate
+from .ledger import record_transaction, record_transactions
+from .statuses import get_initial_status, get_status_ranks, get_status_rank
+from .versions import bump_version, lists_scope
+from .imports import parse_amount, guess_import_format, iter_upload_lines, read_rows, import_payments as import_payment_rows, import_users as import_user_rows
+from .exports import EXPORT_FORMATS, EXPORT_CONTENT_TYPES, export_lines, parse_export_date, transaction_rows, shopping_list_rows, shopping_list_item_rows
+from .catalog import get_default_catalog, create_organisation_catalog, get_organisation_catalog
+from .demand import UNGROUPED_ITEMS, get_item_demand, add_lists_demand, remove_lists_demand
+from transmission.helpers import log_api_error
+from datetime import datetime
+
+"""
+    - The result of calling a service in-process
+    - Mirrors the parts of a requests response that the dashboard uses, so callers can
+      check status_code and call json() without going over http
+"""
+class ServiceResponse:
+
+    def __init__(self, content, status_code=status.HTTP_200_OK):
+        self.content = content
+        self.status_code = status_code
+
+    def json(self):
+        return self.content
+
+"""
+    - The result of a service that streams a file, eg. an export
+    - streaming_content is an iterator of the file's lines, read as the response is sent
+"""
+class StreamingServiceResponse(ServiceResponse):
+
+    def __init__(self, streaming_content, content_type, filename):
+        super().__init__(None)
+        self.streaming_content = streaming_content
+        self.content_type = content_type
+        self.filename = filename
+
+# get the user profile of the user making the request
+# api requests resolve the profile and organisation along with the user, so this doesn't query the database
+def get_user_profile(user):
+    try:
+        return user.userprofile
+    except UserProfile.DoesNotExist:
+        return None
+
+# read a boolean option from request data, which is a string when it comes from a query string
+def get_flag(data, key):
+    value = data.get(key, False)
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+# run a service function, logging and converting any unhandled error to a 400 response
+def call_service(service, user, data, endpoint_name):
+    try:
+        return service(user, data)
+    except Exception as e:
+        log_api_error(
+            error=str(e),
+            endpoint=endpoint_name,
+        )
+        content = {
+            'error': str(e),
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+# run the service behind an api url name in-process, with the same authorisation and response shape as the api
+def dispatch(endpoint, user, data=None, method='POST'):
+    return dispatch_view(resolve(reverse(endpoint)).func.view_class, user, data, method)
+
+# run the service behind an api view class in-process
+def dispatch_view(view_class, user, data=None, method='POST'):
+    if not hasattr(view_class, method.lower()):
+        content = {
+            'detail': f'Method "{method}" not allowed.'
+        }
+        return ServiceResponse(content, status.HTTP_405_METHOD_NOT_ALLOWED)
+    if not user.is_authenticated:
+        content = {
+            'detail': "Authentication credentials were not provided."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+    return call_service(view_class.service, user, data or {}, view_class.endpoint_name)
+
+"""
+    - Gets a list of all users and returns them
+    - Only admin users can access this data
+    - They can only access the information for users at their organisation
+    - Users are returned a page at a time, optionally filtered to usernames or emails starting with a search term
+"""
+def get_all_users(user, data):
+    # get user profile information of the user making the request
+    request_user_profile = get_user_profile(user)
+    request_user_type = request_user_profile.user_type
+    request_user_organisation = request_user_profile.organisation
+
+    # only admin users are authourised to view this information
+    if not request_user_type == 'admin':
+        response_content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(response_content, status.HTTP_401_UNAUTHORIZED)
+
+    # get the user profiles at the request user's organisation, with their users
+    user_profiles = UserProfile.objects.filter(
+        organisation=request_user_organisation
+    ).select_related('user').order_by('user_id')
+
+    # filter by username or email prefix
+    search = data.get('search')
+    if search:
+        user_profiles = user_profiles.filter(
+            Q(user__username__istartswith=search) | Q(user__email__istartswith=search)
+        )
+
+    # continue from the last user on the previous page
+    cursor = data.get('cursor')
+    if cursor:
+        user_id, = decode_cursor(cursor)
+        user_profiles = user_profiles.filter(user_id__gt=int(user_id))
+    page_size = get_page_size(data)
+    user_profiles, next_cursor = paginate(
+        user_profiles[:page_size + 1],
+        page_size,
+        lambda user_profile: (user_profile.user_id,)
+    )
+
+    content = {
+        "user_profiles": [],
+        "next_cursor": next_cursor
+    }
+    for user_profile in user_profiles:
+        # add the user information to return content data
+        user_data = {
+            "auth_info": {
+                "user_id": user_profile.user.id,
+                "username": user_profile.user.username,
+                "email": user_profile.user.email
+            },
+            "organisation": str(request_user_organisation),
+            "user_type": str(user_profile.user_type)
+        }
+        content["user_profiles"].append(user_data)
+    return ServiceResponse(content)
+
+"""
+    - Create a user object
+    - Create a user profile
+"""
+def register_user(user, data):
+    try:
+        # get registration data from json
+        username = data['username']
+        email = data['email']
+        password = data['password']
+        admin_id = data['admin_id']
+        user_type = data['user_type']
+
+        # get the organisation object from the requesting user's admin id
+        organisation = UserProfile.objects.get(id=admin_id).organisation
+
+        # create user object
+        new_user = User(
+            username=username,
+            email=email
+        )
+        new_user.set_password(password)
+
+        # create user profile
+        user_profile = UserProfile(
+            user=new_user,
+            organisation=organisation,
+            user_type=user_type
+        )
+
+        # save user and user_profile
+        new_user.save()
+        user_profile.save()
+
+        content = {
+            "success": True,
+            "user": model_to_dict(user_profile)
+        }
+        return ServiceResponse(content)
+    except IntegrityError as e:
+        log_api_error(
+            error=str(e),
+            endpoint="register-user/",
+        )
+        content = {
+            "success": False,
+            "error": str(e),
+        }
+        return ServiceResponse(content, status.HTTP_409_CONFLICT)
+    except Exception as e:
+        log_api_error(
+            error=str(e),
+            endpoint="register-user/",
+        )
+        content = {
+            "success": False,
+            "error": str(e)
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+"""
+    - Create a new organisation
+    - Create the first admin user for the organisation
+    - Set the default organisation custom groups and items
+    - Everything is written in one database transaction, so a failure never leaves a half provisioned organisation
+"""
+def register_organisation(user, data):
+    try:
+        # get registartion information from json
+        username = data['username']
+        email = data['email']
+        password = data['password']
+        organisation_name = data['organisation_name']
+
+        # check if user or organisation already exist in db
+        user_exists = User.objects.filter(username=username).exists()
+        organisation_exists = Organisation.objects.filter(organisation_name=organisation_name).exists()
+
+        if user_exists or organisation_exists:
+            # return 409 if user or organisation already exists
+            content = {
+                "success": False,
+                'user_exists': True if user_exists else False,
+                'organisation_exists': True if organisation_exists else False,
+            }
+            return ServiceResponse(content, status.HTTP_409_CONFLICT)
+
+        # create new admin user
+        admin_user = User(username=username, email=email)
+        admin_user.set_password(password)
+
+        with atomic():
+            # save the new admin user, organisation and user profile, and create default organisation settings
+            admin_user.save()
+            organisation = Organisation.objects.create(organisation_name=organisation_name)
+            user_profile = UserProfile.objects.create(user=admin_user, organisation=organisation, user_type='admin')
+            create_organisation_catalog(organisation, get_default_catalog())
+
+        content = {
+            "success": True,
+            "user": model_to_dict(user_profile),
+            "organisation": model_to_dict(organisation)
+        }
+        return ServiceResponse(content)
+    except IntegrityError as e:
+        # the user or organisation was created by another request since the checks above
+        log_api_error(
+            error=str(e),
+            endpoint="register-organisation/",
+        )
+        content = {
+            "success": False,
+            'user_exists': User.objects.filter(username=username).exists(),
+            'organisation_exists': Organisation.objects.filter(organisation_name=organisation_name).exists(),
+        }
+        return ServiceResponse(content, status.HTTP_409_CONFLICT)
+    except Exception as e:
+        log_api_error(
+            error=str(e),
+            endpoint="register-organisation/",
+        )
+        content = {
+            "success": False,
+            "error": str(e)
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+"""
+    - Check if the requesting user is an admin user
+"""
+def user_is_admin(user, data):
+    # default to false
+    content = {
+        "is_admin": False,
+    }
+    user_profile = get_user_profile(user)
+    if user_profile.is_admin():
+        # if user is an admin user return true
+        content['is_admin'] = True
+    return ServiceResponse(content)
+
+"""
+    - Get a list of all custom items:
+    - If the user is an admin user, get the organisation's items
+    - If the user is a user user, get their personal custom items
+"""
+def get_custom_items(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+
+    return_data = {}
+    if user_type == 'admin':
+        # get this user's organisation's custom item groups and their items from the cached catalog
+        for group_name, items in get_organisation_catalog(user_profile.organisation_id).items():
+            return_data[group_name] = [dict(item) for item in items]
+    elif user_type == 'user':
+        # get all this user's custom items and add to return data
+        items = UserCustomListOption.objects.filter(user=user)
+        group_data = []
+        for item in items:
+            item_data = {
+                'item_id': item.id,
+                'item_name': item.item_name,
+                'price': item.price
+            }
+            group_data.append(item_data)
+        return_data['Custom Items'] = group_data
+
+    content = {
+        "groups": return_data
+    }
+    return ServiceResponse(content)
+
+"""
+    - Create a new custom item
+"""
+def custom_items(user, data):
+    # get item name and price from request data and convert to lower case
+    item_id = data['item_id']
+    item_name = data['item_name'].lower()
+    price = data['price']
+
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+    organisation = user_profile.organisation
+
+    if user_type == 'admin':
+        group_name = data['group_name'].lower()
+        group = OrganisationCustomListGroup.objects.filter(group_name=group_name, organisation=organisation).first()
+        if item_id:
+            # updating so is not a duplicate creation
+            is_duplicate = False
+
+            # update an existing item
+            existing_item = OrganisationCustomListOption.objects.get(id=item_id)
+            if item_name:
+                existing_item.item_name = item_name
+            if price:
+                existing_item.price = price
+            if group:
+                existing_item.group = group
+
+            existing_item.save()
+        else:
+            # check all organisation custom items for existing item with the same item name
+            is_duplicate = OrganisationCustomListOption.objects.filter(item_name=item_name, organisation=organisation).exists()
+
+            # create organisation custom item
+            item = OrganisationCustomListOption(item_name=item_name, organisation=organisation, group=group)
+            if price:
+                item.price = Decimal(price)
+            item.save()
+    elif user_type == 'user':
+        if item_id:
+            # updating so is not a duplicate creation
+            is_duplicate = False
+
+            # update an existing item
+            existing_item = UserCustomListOption.objects.get(id=item_id)
+            if item_name:
+                existing_item.item_name = item_name
+            if price:
+                existing_item.price = price
+            existing_item.save()
+        else:
+            # check all user custom items for existing item with the same item name
+            is_duplicate = UserCustomListOption.objects.filter(item_name=item_name, user=user).exists()
+
+            # create user custom item
+            item = UserCustomListOption(item_name=item_name, user=user)
+            if price:
+                item.price = Decimal(price)
+            item.save()
+    if is_duplicate:
+        content = {
+            "success": False,
+            "errors": "An item with this name already exists."
+        }
+        return ServiceResponse(content, status.HTTP_409_CONFLICT)
+    content = {
+        "item_name": item_name
+    }
+    return ServiceResponse(content)
+
+"""
+    - Add a new custom group to the organisation's custom items
+"""
+def add_group(user, data):
+    # get group name from request data and convert to lowercase
+    group_name = data['group_name'].lower()
+
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+    organisation = user_profile.organisation
+
+    if user_type == 'admin':
+        # check all organisation custom groups for existing group with the same group name
+        is_duplicate = OrganisationCustomListGroup.objects.filter(group_name=group_name, organisation=organisation).exists()
+
+        # create organisation custom group
+        group = OrganisationCustomListGroup(group_name=group_name, organisation=organisation)
+    if is_duplicate:
+        content = {
+            "success": False,
+            "errors": "An group with this name already exists."
+        }
+        return ServiceResponse(content, status.HTTP_409_CONFLICT)
+    group.save()
+    content = {
+        "group_name": group_name
+    }
+    return ServiceResponse(content)
+
+"""
+    - Get the organisation's group names to help build the add group form for admin users.
+"""
+def get_groups(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+
+    content = {}
+    if user_type == 'admin':
+
+        organisation = user_profile.organisation
+
+        # get all groups for the request user's organisation and add to response data
+        groups = OrganisationCustomListGroup.objects.filter(organisation=organisation)
+
+        return_groups = []
+        for group in groups:
+            return_groups.append(group.group_name)
+        content['groups'] = return_groups
+
+    content['user_type'] = user_type
+    return ServiceResponse(content)
+
+"""
+    - Get a list of all shopping list items available to a user for the purpose of populating the new list form
+"""
+def get_shopping_list_items(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+
+    # initialise response json
+    content = {}
+
+    # get all groups from the request user's organisation and their items from the cached catalog
+    for group_name, items in get_organisation_catalog(user_profile.organisation_id).items():
+        group_custom_items = [{'item_name': item['item_name'], 'price': item['price']} for item in items]
+        content[group_name] = group_custom_items
+
+    # get all request user's custom items and add to response content
+    user_custom_items_query = UserCustomListOption.objects.filter(user=user)
+    user_custom_items = [{'item_name': item.item_name, 'price': item.price} for item in user_custom_items_query]
+    content['user custom items'] = user_custom_items
+
+    return ServiceResponse(content)
+
+"""
+    - Create shopping lists in their initial state, given (user, form_data) pairs
+    - The lists and all of their items are written in one database transaction, with the items in a
+      single bulk insert, and the lists are counted towards the organisation's generated list
+"""
+@atomic
+def create_shopping_lists(organisation, entries):
+    initial_status = get_initial_status()
+    time_created = datetime.now()
+
+    # create a new shopping list object for every entry
+    shopping_lists = []
+    lists_item_names = []
+    for list_user, form_data in entries:
+        shopping_lists.append(ShoppingList(user=list_user, organisation=organisation, status=initial_status, time_created=time_created))
+        lists_item_names.append([item_name for group, items in form_data.items() for item_name in items])
+
+    # save the shopping lists in one insert
+    ShoppingList.objects.bulk_create(shopping_lists)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # read the new ids back where the database doesn't return them from the insert. The insert holds the
+        # database's write lock until this transaction ends, so the newest lists are the ones just inserted.
+        list_ids = ShoppingList.objects.filter(
+            user__in={shopping_list.user_id for shopping_list in shopping_lists},
+            time_created=time_created
+        ).order_by('-id').values_list('id', flat=True)[:len(shopping_lists)]
+        for shopping_list, list_id in zip(shopping_lists, reversed(list_ids)):
+            shopping_list.id = list_id
+
+    # save the items of every list in one insert
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(shopping_list=shopping_list, item_name=item_name)
+        for shopping_list, item_names in zip(shopping_lists, lists_item_names)
+        for item_name in item_names
+    ])
+
+    # count the new lists towards the organisation's generated list
+    add_lists_demand(organisation, lists_item_names)
+
+    # the bulk inserts don't send signals, so move the organisation's lists to a new version here
+    bump_version(lists_scope(organisation.id))
+    return shopping_lists
+
+"""
+    - Create a new shopping list
+"""
+def create_new_shopping_list(user, data):
+    # get shopping list data from request
+    form_data = data['form_data']
+
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    organisation = user_profile.organisation
+
+    create_shopping_lists(organisation, [(user, form_data)])
+    content = {
+        "success": True
+    }
+    return ServiceResponse(content)
+
+"""
+    - Admin users can create lists for many users at their organisation in one request, eg. to import recurring orders
+    - Takes a list of {'user_id', 'form_data'} entries and creates all of the lists or none of them
+"""
+def create_new_shopping_lists(user, data):
+    # get shopping list data from request
+    entries = data['lists']
+
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+    organisation = user_profile.organisation
+
+    # only admin users can create lists for other users
+    if user_type != 'admin':
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    # lists can only be created for users at the admin's own organisation
+    user_ids = {int(entry['user_id']) for entry in entries}
+    list_users = User.objects.filter(userprofile__organisation=organisation).in_bulk(user_ids)
+    unknown_user_ids = sorted(user_ids - set(list_users))
+    if unknown_user_ids:
+        content = {
+            'error': f"Unknown users: {', '.join(str(user_id) for user_id in unknown_user_ids)}",
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+    shopping_lists = create_shopping_lists(
+        organisation,
+        [(list_users[int(entry['user_id'])], entry['form_data']) for entry in entries]
+    )
+    content = {
+        "success": True,
+        "list_ids": [shopping_list.id for shopping_list in shopping_lists]
+    }
+    return ServiceResponse(content)
+
+"""
+    - Get all shopping lists a user is authorised to view, newest first
+    - Lists are returned a page at a time. Pass the next_cursor from a response as the cursor
+      of the next request to get the following page.
+    - Lists are keyed by their user's username. An admin's page only has keys for the users with lists on it;
+      the organisation's users, including those without lists, are paged by get_all_users.
+"""
+def get_lists(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+    organisation = user_profile.organisation
+
+    # initialise respose json
+    content = {
+        'lists': {}
+    }
+    cursor = data.get('cursor')
+    shopping_lists = ShoppingList.objects.select_related('user').defer('notes').order_by('-time_created', '-id')
+    if user_type == 'admin':
+        # an admin user can view the lists of all users at their organisation
+        shopping_lists = shopping_lists.filter(organisation=organisation)
+    elif user_type == 'user':
+        # if the requesting user is not 'admin', they are only authorized to view their own information.
+        shopping_lists = shopping_lists.filter(user=user)
+        content['lists'][user.username] = []
+    else:
+        shopping_lists = shopping_lists.none()
+
+    # continue from the last list on the previous page
+    if cursor:
+        time_created, list_id = decode_datetime_cursor(cursor)
+        shopping_lists = shopping_lists.filter(
+            Q(time_created__lt=time_created) | Q(time_created=time_created, id__lt=list_id)
+        )
+    page_size = get_page_size(data)
+    shopping_lists, next_cursor = paginate(
+        shopping_lists[:page_size + 1],
+        page_size,
+        lambda shopping_list: (shopping_list.time_created, shopping_list.id)
+    )
+
+    for shopping_list in shopping_lists:
+        # get the list information and add it to the owner's lists, using their username as a key
+        list_data = {
+            'list_id': shopping_list.id,
+            'list_name': str(shopping_list),
+            'list_price': shopping_list.price if shopping_list.price else None,
+            'list_status': shopping_list.status if shopping_list.status else None
+        }
+        content['lists'].setdefault(shopping_list.user.username, []).append(list_data)
+    content['next_cursor'] = next_cursor
+
+    return ServiceResponse(content)
+
+"""
+    - Get the data for one list if user is authorised
+"""
+def list_detail(user, data):
+    # get list id from the request data
+    list_id = data['list_id']
+
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+    organisation = user_profile.organisation
+
+    # get the shopping list using the list id
+    shopping_list = ShoppingList.objects.filter(id=list_id).first()
+    # identify the user that is the author of the shoppig list
+    shopping_list_owner = shopping_list.user
+    # get that user's profile
+    shopping_list_owner_profile = UserProfile.objects.filter(user=shopping_list_owner).first()
+    shopping_list_owner_organisation = shopping_list_owner_profile.organisation
+    authorised = False # default to unauthorised
+    if user_type == 'admin' and shopping_list_owner_organisation == organisation:
+        # an admin user is only authorised to see the lists of users at their own organisation
+        authorised = True
+    elif user_type == 'user' and shopping_list_owner == user:
+        # a 'user' user can only view their own list
+        authorised = True
+
+    if not authorised:
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    # get all the items from the shopping list
+    shopping_list_items = ShoppingListItem.objects.filter(shopping_list=shopping_list)
+
+    # get the list data and append it to the response json
+    list_id = shopping_list.id
+    list_name = str(shopping_list)
+    list_price = shopping_list.price if shopping_list.price else None
+    list_status = shopping_list.status if shopping_list.status else None
+
+    list_items = []
+    for item in shopping_list_items:
+        list_items.append(item.item_name)
+
+    list_notes = shopping_list.notes if shopping_list.notes else None
+
+    list_data = {
+        'list_id': list_id,
+        'list_name': list_name,
+        'list_price': list_price,
+        'list_status': list_status,
+        'list_items': list_items,
+        'list_notes': list_notes
+    }
+
+    content = {
+        'list': list_data
+    }
+    return ServiceResponse(content)
+
+# the transaction that charges a list's user for a change to the list's price, or None if the price hasn't changed
+def price_change_transaction(shopping_list, price, transaction_datetime):
+    if shopping_list.price == None:
+        # if the db price value is not set, add a price
+        return Transaction(
+            user_id=shopping_list.user_id,
+            transaction_amount=price,
+            transaction_datetime=transaction_datetime,
+            detail="List price added."
+        )
+    if shopping_list.price != price:
+        # if the db list price is different than the form price, register the difference
+        difference = price - shopping_list.price
+        return Transaction(
+            user_id=shopping_list.user_id,
+            transaction_amount=difference,
+            transaction_datetime=transaction_datetime,
+            detail=f"List price updated. Old price: ${shopping_list.price}, New price: ${price}, Difference: ${difference}"
+        )
+    return None
+
+"""
+    - Admin users can update the price, status and add notes to a list
+"""
+@atomic
+def update_list(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_type = user_profile.user_type
+    organisation = user_profile.organisation
+
+    # initialise response content json
+    content = {}
+
+    # pull info from request data
+    list_id = data['list_id']
+    price = parse_amount(data['price'])
+    list_status = data['status']
+    notes = data['notes']
+
+    # get the shopping list using list id with the profile of its author, locking the list until the update is saved
+    shopping_list = ShoppingList.objects.select_for_update(of=('self',)).select_related(
+        'organisation', 'user__userprofile'
+    ).filter(id=list_id).first()
+    shopping_list_user_profile = shopping_list.user.userprofile
+    if not (user_type == 'admin' and organisation.id == shopping_list_user_profile.organisation_id):
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+    if price is None:
+        content = {
+            'error': f"Invalid price: {data['price']}",
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+    transaction = price_change_transaction(shopping_list, price, datetime.now())
+    # set the new price data
+    shopping_list.price = price
+    shopping_list.notes = notes
+
+    # only allow updates in a 'forwards' direction. ie. A COMPLETE list cannot go back to CREATED.
+    db_rank = get_status_rank(shopping_list.status)
+    list_rank = get_status_rank(list_status)
+    if db_rank < list_rank:
+        shopping_list.status = list_status
+    if transaction:
+        # record the price change on the user's account
+        record_transaction(transaction)
+    # saving the list moves its items out of the organisation's generated list once it has been shopped for
+    shopping_list.save()
+    return ServiceResponse(content)
+
+"""
+    - Admin users can update the price, status and notes of many lists at their organisation in one request,
+      eg. after a shopping trip
+    - data['lists'] is a list of {list_id, price, status, notes}. Only the fields given in an entry are changed.
+    - Statuses may only move forwards. Every entry is checked before anything is written, and if any entry is
+      invalid nothing is updated and the errors are returned for each entry.
+    - The lists, the price change transactions and the generated list demand are written in one atomic batch
+"""
+@atomic
+def update_lists(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    organisation = user_profile.organisation
+    if user_profile.user_type != 'admin':
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    entries = data['lists']
+    status_ranks = get_status_ranks()
+
+    # get every list being updated at the admin's organisation in one query, locking them until the update is saved
+    shopping_lists = ShoppingList.objects.select_for_update().filter(
+        id__in=[entry['list_id'] for entry in entries],
+        user__userprofile__organisation=organisation
+    ).in_bulk()
+
+    # check every entry before writing anything
+    errors = []
+    updates = []
+    seen_list_ids = set()
+    for index, entry in enumerate(entries):
+        list_id = entry['list_id']
+        shopping_list = shopping_lists.get(int(list_id))
+        changes = {field: entry[field] for field in ('price', 'status', 'notes') if field in entry}
+        if 'price' in changes:
+            # a price has to fit the list's price and a Transaction: finite, below 10000 and in whole cents
+            changes['price'] = parse_amount(changes['price'])
+        list_status = changes.get('status')
+
+        if shopping_list is None:
+            error = "List not found."
+        elif shopping_list.id in seen_list_ids:
+            error = "List appears more than once."
+        elif 'price' in changes and changes['price'] is None:
+            error = f"Invalid price: {entry['price']}"
+        elif 'status' in changes and list_status not in status_ranks:
+            error = f"Unknown status: {list_status}"
+        elif 'status' in changes and shopping_list.status not in status_ranks:
+            error = f"The list has an unknown status: {shopping_list.status}"
+        elif 'status' in changes and status_ranks[list_status] < status_ranks[shopping_list.status]:
+            # only allow updates in a 'forwards' direction. ie. A COMPLETE list cannot go back to CREATED.
+            error = f"A {shopping_list.status} list can't be moved back to {list_status}."
+        else:
+            seen_list_ids.add(shopping_list.id)
+            updates.append((shopping_list, changes))
+            continue
+        errors.append({
+            'index': index,
+            'list_id': list_id,
+            'error': error
+        })
+
+    if errors:
+        content = {
+            'errors': errors,
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+    transaction_datetime = datetime.now()
+    transactions = []
+    shopped_list_ids = []
+    for shopping_list, changes in updates:
+        if 'price' in changes:
+            transaction = price_change_transaction(shopping_list, changes['price'], transaction_datetime)
+            if transaction:
+                transactions.append(transaction)
+        if 'status' in changes and status_ranks[shopping_list.status] == 0 and status_ranks[changes['status']] > 0:
+            shopped_list_ids.append(shopping_list.id)
+        for field, value in changes.items():
+            setattr(shopping_list, field, value)
+
+    # save every list in one update and record the price changes on the users' accounts
+    changed_fields = sorted({field for shopping_list, changes in updates for field in changes})
+    if changed_fields:
+        ShoppingList.objects.bulk_update([update[0] for update in updates], changed_fields)
+    record_transactions(transactions)
+
+    # the shopped lists no longer count towards the organisation's generated list
+    lists_item_names = {list_id: [] for list_id in shopped_list_ids}
+    list_items = ShoppingListItem.objects.filter(
+        shopping_list_id__in=shopped_list_ids
+    ).values_list('shopping_list_id', 'item_name')
+    for list_id, item_name in list_items:
+        lists_item_names[list_id].append(item_name)
+    remove_lists_demand(organisation, lists_item_names.values())
+
+    # the bulk update doesn't send signals, so move the organisation's lists to a new version here
+    bump_version(lists_scope(organisation.id))
+
+    content = {
+        'list_ids': [update[0].id for update in updates]
+    }
+    return ServiceResponse(content)
+
+"""
+    - Generates and returns a list by collating all the items for all users in an organisation
+    - Do not include lists that have already been shopped for
+"""
+def generate_list(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_organisation = user_profile.organisation
+    user_type = user_profile.user_type
+    if user_type != 'admin':
+        # only admin users are authorised to see this info
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    # optionally group the items by the organisation's custom groups
+    group_items = get_flag(data, 'group_items')
+
+    content = {
+        'list_items': {}
+    }
+    if group_items:
+        content['groups'] = {}
+
+    # read the demand counts kept up to date as lists are created and shopped for
+    for item in get_item_demand(user_organisation, group_items=group_items):
+        content['list_items'][item['item_name']] = item['list_count']
+        if group_items:
+            group_name = item['group_name'] or UNGROUPED_ITEMS
+            content['groups'].setdefault(group_name, {})[item['item_name']] = item['list_count']
+    return ServiceResponse(content)
+
+"""
+    - Get user profile information
+"""
+def user_detail(user, data):
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_organisation = user_profile.organisation
+    user_type = user_profile.user_type
+
+    # get user id from request data
+    user_id = data['user_id']
+
+    # get the user object we want to return
+    user_detail_user = User.objects.get(id=user_id)
+    user_detail_profile = UserProfile.objects.get(user=user_detail_user)
+    user_detail_organisation = user_detail_profile.organisation
+
+    authorised = False
+    if user_type == 'admin' and user_organisation == user_detail_organisation:
+        # an admin user can only view users at their own organisation
+        authorised = True
+    if user_type == 'user' and user_profile == user_detail_profile:
+        # a user user can only view their own profile
+        authorised = True
+    if not authorised:
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    # get user auth info
+    user_info = {
+        'user_id': user_detail_user.id,
+        'username': user_detail_user.username,
+        'email': user_detail_user.email or "n/a"
+    }
+    # get a list of all the user's lists, oldest first
+    user_lists = ShoppingList.objects.filter(user=user_detail_user).select_related('user').order_by('id')
+    # generate a list of list data from all user's lists
+    list_data = [
+        {
+            'list_name': str(user_list),
+            'list_id': user_list.id,
+            'status': user_list.status
+        }
+        for user_list in user_lists
+    ]
+
+    # get all the transactions on the user's account
+    transactions = Transaction.objects.filter(user=user_detail_user).order_by('-transaction_datetime')
+    # generate a list of transactions from all transaction models
+    transaction_history = [
+        {
+            'user': user_detail_user.username,
+            'datetime': transaction.transaction_datetime.strftime("%Y-%m-%d %H:%M"),
+            'amount': transaction.transaction_amount,
+            'detail': transaction.detail
+        }
+        for transaction in transactions
+    ]
+
+    # the user's account balance is kept up to date as transactions are recorded
+    user_info['balance'] = user_detail_profile.balance
+
+    content = {
+        'profile': {
+            'user_info': user_info,
+            'list_data': list_data,
+            'transaction_history': transaction_history
+        }
+    }
+    return ServiceResponse(content)
+
+"""
+    - An admin user can register a payment against a user at their organisation
+"""
+def register_payment(user, data):
+    # get user profile information of the user making the request
+    admin_user_profile = get_user_profile(user)
+    admin_user_organisation = admin_user_profile.organisation
+    admin_user_type = admin_user_profile.user_type
+
+    # pull form data from the request
+    user_id = data['user_id']
+    payment = data['payment']
+
+    # get the user object that the payment should be applied to
+    list_user = User.objects.get(id=user_id)
+    list_user_profile = UserProfile.objects.filter(user=list_user).first()
+    list_user_organisation = list_user_profile.organisation
+
+    if not (admin_user_type == 'admin' and admin_user_organisation == list_user_organisation):
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    # only admin users can register transactions
+    # they can only register transactions against users at their own organisation
+
+    # make the transaction
+    transaction = Transaction(
+        user=list_user,
+        transaction_amount=-Decimal(payment),
+        transaction_datetime=datetime.now(),
+        detail="Payment made."
+    )
+    record_transaction(transaction)
+    content = {
+
+    }
+    return ServiceResponse(content)
+
+"""
+    - An admin user can import a file of payments against users at their organisation
+    - data['file'] is a CSV or NDJSON upload, read as it is parsed. The format is taken from data['format'],
+      or from the file name.
+    - With data['dry_run'] the file is only checked
+    - If any row has an error nothing is imported, and the errors are returned for each line
+"""
+def import_payments(user, data):
+    # get user profile information of the user making the request
+    admin_user_profile = get_user_profile(user)
+    if admin_user_profile.user_type != 'admin':
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    upload = data['file']
+    import_format = data.get('format') or guess_import_format(upload.name)
+    report = import_payment_rows(
+        admin_user_profile.organisation,
+        read_rows(iter_upload_lines(upload), import_format),
+        dry_run=get_flag(data, 'dry_run')
+    )
+    if report['errors']:
+        report['detail'] = "Something went wrong processing your request."
+        return ServiceResponse(report, status.HTTP_400_BAD_REQUEST)
+    return ServiceResponse(report)
+
+"""
+    - An admin user can import a file of users into their organisation
+    - data['file'] is a CSV or NDJSON upload of username, email, password and user_type rows, read as it is
+      parsed. The format is taken from data['format'], or from the file name.
+    - With data['dry_run'] the file is only checked
+    - If any row has an error or a conflict nothing is imported, and the errors are returned for each line
+"""
+def import_users(user, data):
+    # get user profile information of the user making the request
+    admin_user_profile = get_user_profile(user)
+    if admin_user_profile.user_type != 'admin':
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    upload = data['file']
+    import_format = data.get('format') or guess_import_format(upload.name)
+    report = import_user_rows(
+        admin_user_profile.organisation,
+        read_rows(iter_upload_lines(upload), import_format),
+        dry_run=get_flag(data, 'dry_run')
+    )
+    if report['errors']:
+        report['detail'] = "Something went wrong processing your request."
+        return ServiceResponse(report, status.HTTP_400_BAD_REQUEST)
+    return ServiceResponse(report)
+
+# stream one of the admin's organisation's exports, eg. transaction_rows, as a csv or ndjson file
+def stream_export(user, data, export_rows, export_name):
+    # get user profile information of the user making the request
+    admin_user_profile = get_user_profile(user)
+    if admin_user_profile.user_type != 'admin':
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    export_format = data.get('export_format') or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        content = {
+            'error': f"Unknown export format: {export_format}",
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+    columns, rows = export_rows(
+        admin_user_profile.organisation,
+        start=parse_export_date(data.get('start')),
+        end=parse_export_date(data.get('end'))
+    )
+    return StreamingServiceResponse(
+        export_lines(columns, rows, export_format),
+        EXPORT_CONTENT_TYPES[export_format],
+        f"{export_name}.{export_format}"
+    )
+
+"""
+    - An admin user can export the transactions of the users at their organisation
+    - data['export_format'] is csv (the default) or ndjson, and data['start'] and data['end'] optionally limit
+      the export to transactions from start up to end, as ISO dates or datetimes
+"""
+def export_transactions(user, data):
+    return stream_export(user, data, transaction_rows, 'transactions')
+
+"""
+    - An admin user can export the shopping lists of the users at their organisation
+    - Takes the same format and date range as export_transactions, filtering on the time the lists were created
+"""
+def export_lists(user, data):
+    return stream_export(user, data, shopping_list_rows, 'lists')
+
+"""
+    - An admin user can export the items on the shopping lists of the users at their organisation
+    - Takes the same format and date range as export_lists
+"""
+def export_list_items(user, data):
+    return stream_export(user, data, shopping_list_item_rows, 'list-items')
+
+"""
+    - Get a single custom item if the user is authorised to edit it
+"""
+def get_custom_item(user, data):
+    # get the item id from the request data
+    item_id = data['item_id']
+
+    # get user profile information of the user making the request
+    user_profile = get_user_profile(user)
+    user_organisation = user_profile.organisation
+    user_type = user_profile.user_type
+
+    authorised = False # default to false
+    if user_type == 'admin':
+        # get the item by item id
+        item = OrganisationCustomListOption.objects.get(id=item_id)
+
+        # verify that the item belongs to the user's organisation
+        if item.organisation == user_organisation:
+            authorised = True
+    else:
+        # get the item by item id
+        item = UserCustomListOption.objects.get(id=item_id)
+
+        # verify that the item belongs to the user
+        if item.user == user:
+            authorised = True
+
+    if not authorised:
+        content = {
+            'detail': "You are not authorised to view this page."
+        }
+        return ServiceResponse(content, status.HTTP_401_UNAUTHORIZED)
+
+    content = {
+        'item': {
+            'id': item.id,
+            'item_name': item.item_name,
+            'price': item.price
+        }
+    }
+    if user_type == 'admin':
+        content['item']['group'] = OrganisationCustomListGroup.objects.get(id=item.group.id).group_name,
+    return ServiceResponse(content)
+
+"""
+    - Run many api requests in one round trip
+    - The request principal is resolved once, by the batch request itself, and every sub-request runs
+      in-process against the api.urls routes as that user
+    - Each sub-request is {"endpoint": "user-detail/", "method": "POST", "data": {...}}, and gets its own
+      status code and content in the response, in order. A failing sub-request doesn't stop the others.
+"""
+def batch(user, data):
+    sub_requests = data.get('requests')
+    if not isinstance(sub_requests, list) or not all(
+        isinstance(sub_request, dict)
+        and isinstance(sub_request.get('endpoint'), str)
+        and isinstance(sub_request.get('method', 'POST'), str)
+        and isinstance(sub_request.get('data') or {}, dict)
+        for sub_request in sub_requests
+    ):
+        content = {
+            'error': "requests must be a list of objects, each with an endpoint and optionally a method and data object.",
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+    if len(sub_requests) > settings.API_BATCH_MAX_REQUESTS:
+        content = {
+            'error': f"A batch can hold at most {settings.API_BATCH_MAX_REQUESTS} requests.",
+            'detail': "Something went wrong processing your request."
+        }
+        return ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+
+    responses = []
+    for sub_request in sub_requests:
+        endpoint = sub_request['endpoint']
+        try:
+            view_class = resolve('/' + endpoint.lstrip('/'), urlconf='api.urls').func.view_class
+        except Resolver404:
+            result = ServiceResponse({'detail': "Not found."}, status.HTTP_404_NOT_FOUND)
+        else:
+            if getattr(view_class, 'service', None) is None or not getattr(view_class, 'batchable', False):
+                content = {
+                    'error': f"{endpoint} can't be called from a batch.",
+                    'detail': "Something went wrong processing your request."
+                }
+                result = ServiceResponse(content, status.HTTP_400_BAD_REQUEST)
+            else:
+                result = dispatch_view(view_class, user, sub_request.get('data'), sub_request.get('method', 'POST'))
+        responses.append({
+            'endpoint': endpoint,
+            'status_code': result.status_code,
+            'content': result.json()
+        })
+
+    content = {
+        'responses': responses
+    }
+    return ServiceResponse(content)
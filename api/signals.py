@@ -0,0 +1,159 @@
+from django.conf import settings
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_principals
+from .demand import add_item_demand, remove_item_demand, change_list_status_demand, rebuild_item_demand
+from .statuses import invalidate_status_ranks
+from .versions import bump_version, bump_user_lists_versions, catalog_scope, lists_scope, user_items_scope
+from .models import (
+    Organisation, UserProfile, ListStatus, OrganisationCustomListGroup, OrganisationCustomListOption, UserCustomListOption,
+    ShoppingList, ShoppingListItem, Transaction
+)
+
+"""
+    - Move the token scopes of request tokens to a new version when the data they were resolved from changes
+    - Drop the cached list status table when a status changes
+    - Move an organisation's catalog scope to a new version when one of its groups or items changes
+    - Move a user's custom items scope to a new version when one of their custom items changes
+    - Move an organisation's lists scope to a new version when a list, list item, transaction, profile or user
+      of one of its members changes. Bulk writes don't send signals, so api.services and api.ledger bump
+      the lists scope themselves after them.
+    - Give a list saved without an organisation its user's organisation, and move a user's lists, and the item
+      demand they count towards, to their profile's new organisation when it changes
+    - Keep the organisation's item demand in step when a list moves into or out of CREATED, or an item on a
+      CREATED list is saved or deleted. Deleting a list or user deletes its items first, one by one, so their
+      demand is removed with them. Bulk writes don't send signals, so api.services counts them itself.
+"""
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance=None, **kwargs):
+    invalidate_principals([instance.key])
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance=None, created=False, **kwargs):
+    # the tokens of a new user have never been resolved
+    if created:
+        return
+    invalidate_principals(Token.objects.filter(user_id=instance.id).values_list('key', flat=True))
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_tokens(sender, instance=None, **kwargs):
+    invalidate_principals(Token.objects.filter(user_id=instance.user_id).values_list('key', flat=True))
+
+@receiver(post_save, sender=ListStatus)
+@receiver(post_delete, sender=ListStatus)
+def invalidate_list_statuses(sender, **kwargs):
+    invalidate_status_ranks()
+
+@receiver(post_save, sender=OrganisationCustomListGroup)
+@receiver(post_delete, sender=OrganisationCustomListGroup)
+@receiver(post_save, sender=OrganisationCustomListOption)
+@receiver(post_delete, sender=OrganisationCustomListOption)
+def invalidate_organisation_catalog(sender, instance=None, **kwargs):
+    bump_version(catalog_scope(instance.organisation_id))
+
+@receiver(post_save, sender=UserCustomListOption)
+@receiver(post_delete, sender=UserCustomListOption)
+def invalidate_user_items(sender, instance=None, **kwargs):
+    bump_version(user_items_scope(instance.user_id))
+
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def invalidate_list_lists(sender, instance=None, **kwargs):
+    if instance.organisation_id is None:
+        bump_user_lists_versions([instance.user_id])
+    else:
+        bump_version(lists_scope(instance.organisation_id))
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_organisation_lists(sender, instance=None, **kwargs):
+    bump_user_lists_versions([instance.user_id])
+
+# get-lists and user-detail show usernames and emails, so a saved user moves their organisation's lists scope.
+# A login only updates last_login, which no endpoint shows.
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_lists(sender, instance=None, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    bump_user_lists_versions([instance.id])
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_lists(sender, instance=None, **kwargs):
+    bump_version(lists_scope(instance.organisation_id))
+
+@receiver(post_save, sender=ShoppingListItem)
+@receiver(post_delete, sender=ShoppingListItem)
+def invalidate_list_item_lists(sender, instance=None, **kwargs):
+    bump_user_lists_versions(ShoppingList.objects.filter(id=instance.shopping_list_id).values('user_id'))
+
+# a list saved without an organisation takes its user's, so it is read from the organisation's index
+@receiver(pre_save, sender=ShoppingList)
+def fill_list_organisation(sender, instance=None, **kwargs):
+    if instance.organisation_id is None:
+        instance.organisation_id = UserProfile.objects.filter(
+            user_id=instance.user_id
+        ).values_list('organisation_id', flat=True).first()
+
+# remember the stored organisation of a profile being saved, so post_save can tell whether it moved
+@receiver(pre_save, sender=UserProfile)
+def remember_profile_organisation(sender, instance=None, **kwargs):
+    instance._stored_organisation_id = None if instance._state.adding else (
+        UserProfile.objects.filter(pk=instance.pk).values_list('organisation_id', flat=True).first()
+    )
+
+# move the user's lists to their profile's organisation, and recount the item demand of the organisations they
+# moved between. A new profile picks up any lists its user saved before they had one.
+@receiver(post_save, sender=UserProfile)
+def move_user_lists(sender, instance=None, created=False, **kwargs):
+    if not created and instance._stored_organisation_id == instance.organisation_id:
+        return
+    moved_lists = ShoppingList.objects.filter(user_id=instance.user_id).exclude(organisation_id=instance.organisation_id)
+    organisation_ids = set(moved_lists.values_list('organisation_id', flat=True).distinct())
+    if not organisation_ids:
+        return
+    moved_lists.update(organisation_id=instance.organisation_id)
+    organisation_ids.add(instance.organisation_id)
+    for organisation in Organisation.objects.filter(id__in=organisation_ids):
+        rebuild_item_demand(organisation)
+
+# remember the stored status of a list being saved, so post_save can tell whether it moved into or out of CREATED.
+# A list loaded with its status already knows it; one built by hand or loaded without it reads it.
+@receiver(pre_save, sender=ShoppingList)
+def remember_list_status(sender, instance=None, **kwargs):
+    if instance._state.adding:
+        instance._stored_status = None
+    elif getattr(instance, '_loaded_status', None) is not None:
+        instance._stored_status = instance._loaded_status
+    else:
+        instance._stored_status = ShoppingList.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+@receiver(post_save, sender=ShoppingList)
+def update_list_status_demand(sender, instance=None, created=False, **kwargs):
+    if not created:
+        change_list_status_demand(instance, instance._stored_status)
+    instance._loaded_status = instance.status
+
+# remember the stored list and name of an item being saved, so post_save can move its demand
+@receiver(pre_save, sender=ShoppingListItem)
+def remember_list_item(sender, instance=None, **kwargs):
+    instance._stored_item = None if instance._state.adding else (
+        ShoppingListItem.objects.filter(pk=instance.pk).values_list('shopping_list_id', 'item_name').first()
+    )
+
+@receiver(post_save, sender=ShoppingListItem)
+def update_list_item_demand(sender, instance=None, **kwargs):
+    stored_item = instance._stored_item
+    if stored_item == (instance.shopping_list_id, instance.item_name):
+        return
+    if stored_item is not None:
+        remove_item_demand(*stored_item)
+    add_item_demand(instance)
+
+@receiver(post_delete, sender=ShoppingListItem)
+def remove_list_item_demand(sender, instance=None, **kwargs):
+    remove_item_demand(instance.shopping_list_id, instance.item_name)
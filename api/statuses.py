@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import ListStatus
+
+"""
+    - Cached lookups of the list statuses
+    - The statuses rarely change, so the label -> rank table is read once and kept in the cache for
+      STATUS_CACHE_TIMEOUT seconds, or until api.signals drops it when a ListStatus is saved or deleted
+"""
+
+STATUS_RANKS_CACHE_KEY = "api:list-status-ranks"
+
+# get a dictionary of every status label and its rank
+def get_status_ranks():
+    status_ranks = cache.get(STATUS_RANKS_CACHE_KEY)
+    if status_ranks is None:
+        status_ranks = dict(ListStatus.objects.values_list('label', 'rank'))
+        cache.set(STATUS_RANKS_CACHE_KEY, status_ranks, settings.STATUS_CACHE_TIMEOUT)
+    return status_ranks
+
+# get the rank of a status label, raising ListStatus.DoesNotExist for an unknown label
+def get_status_rank(label):
+    try:
+        return get_status_ranks()[label]
+    except KeyError:
+        raise ListStatus.DoesNotExist(f"ListStatus with label \"{label}\" does not exist.")
+
+# get the label of the status new lists are created with
+def get_initial_status():
+    for label, rank in get_status_ranks().items():
+        if rank == 0:
+            return label
+    raise ListStatus.DoesNotExist("ListStatus with rank 0 does not exist.")
+
+# drop the cached status table
+def invalidate_status_ranks():
+    cache.delete(STATUS_RANKS_CACHE_KEY)
@@ -0,0 +1,250 @@
+import random
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .catalog import get_default_catalog, create_organisation_catalog
+from .demand import rebuild_item_demand
+from .models import (
+    Organisation,
+    UserProfile,
+    ListStatus,
+    ShoppingList,
+    ShoppingListItem,
+    UserCustomListOption,
+    Transaction
+)
+
+"""
+    - Deterministic synthetic organisations, for trying the api locally at production volumes
+    - Every value is drawn from one random.Random(seed), and every row is given its primary key here, so the same
+      options on the same database always write the same rows. Api token keys are the exception: they are
+      generated like any other token, so they can't be worked out from the seed.
+    - Rows are written with bulk_create in batches of SYNTHETIC_BATCH_SIZE, without save() or its signals. Every
+      user shares one password hash, of options['password'] or else SYNTHETIC_PASSWORD, made once so thousands of
+      users cost no hashing time.
+    - The users' balances are worked out from their generated transactions, and each organisation's item demand
+      is rebuilt with one grouped query once its lists are written
+"""
+
+SYNTHETIC_BATCH_SIZE = 2000
+SYNTHETIC_PASSWORD = 'password'
+# the statuses created for a database without any, lowest rank first
+SYNTHETIC_STATUSES = ('CREATED', 'SHOPPED', 'COMPLETE')
+SYNTHETIC_START = datetime(2021, 1, 1)
+
+# the statuses lists can have, lowest rank first, creating the default statuses if there are none
+def get_or_create_statuses():
+    labels = list(ListStatus.objects.order_by('rank').values_list('label', flat=True))
+    if not labels:
+        ListStatus.objects.bulk_create([ListStatus(label=label, rank=rank) for rank, label in enumerate(SYNTHETIC_STATUSES)])
+        labels = list(SYNTHETIC_STATUSES)
+    return labels
+
+"""
+    - Hands out the primary keys of new rows, following on from the largest key of each model
+"""
+class KeyAllocator:
+
+    def __init__(self, *models):
+        self.next_keys = {
+            model: (model.objects.aggregate(largest=Max('pk'))['largest'] or 0) + 1
+            for model in models
+        }
+
+    def next(self, model):
+        key = self.next_keys[model]
+        self.next_keys[model] += 1
+        return key
+
+# a count around an average, between half and one and a half times it
+def vary(rng, average):
+    return rng.randint(average // 2, average + average // 2) if average > 1 else average
+
+# an amount of money between low and high
+def random_amount(rng, low, high):
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+"""
+    - Generate one organisation, with its catalog, users, lists, list items and transactions
+    - The first user is the organisation's admin
+    - Lists are spread over the options['days'] days before end. The oldest lists have moved through every status
+      and have a price; the newest are still in the initial status. Each priced list adds a transaction, and each
+      user makes around options['payments'] payments.
+"""
+def generate_organisation(rng, keys, number, options, statuses, password, end):
+    prefix = options['prefix']
+    organisation = Organisation.objects.create(
+        id=keys.next(Organisation),
+        organisation_name=f"{prefix} organisation {number}"
+    )
+    create_organisation_catalog(organisation, get_default_catalog())
+    catalog_items = [item_name for group in get_default_catalog()['groups'] for item_name in group['items']]
+    start = end - timedelta(days=options['days'])
+    span = (end - start).total_seconds()
+
+    users = []
+    profiles = []
+    tokens = []
+    custom_items = []
+    custom_item_names = defaultdict(list)
+    for user_number in range(vary(rng, options['users'])):
+        username = f"{prefix}-{number}-{user_number}"
+        user = User(
+            id=keys.next(User),
+            username=username,
+            email=f"{username}@example.com",
+            password=password,
+            date_joined=start
+        )
+        users.append(user)
+        profiles.append(UserProfile(
+            id=keys.next(UserProfile),
+            user_id=user.id,
+            organisation=organisation,
+            user_type='admin' if user_number == 0 else 'user',
+            is_first_login=False
+        ))
+        tokens.append(Token(key=Token.generate_key(), user_id=user.id))
+        for item_number in range(rng.randint(0, 3)):
+            custom_items.append(UserCustomListOption(
+                id=keys.next(UserCustomListOption),
+                user_id=user.id,
+                item_name=f"custom item {item_number}",
+                price=random_amount(rng, 1, 10) if rng.random() < 0.5 else None
+            ))
+            custom_item_names[user.id].append(f"custom item {item_number}")
+
+    shopping_lists = []
+    list_items = []
+    transactions = []
+    balances = defaultdict(Decimal)
+    for user in users:
+        for list_number in range(vary(rng, options['lists'])):
+            time_created = start + timedelta(seconds=rng.uniform(0, span))
+            # the older a list, the further through the statuses it has moved
+            age = (end - time_created).total_seconds() / span
+            status_index = min(len(statuses) - 1, int(age * len(statuses) * 1.5))
+            price = random_amount(rng, 5, 150) if status_index > 0 else None
+            shopping_list = ShoppingList(
+                id=keys.next(ShoppingList),
+                user_id=user.id,
+                organisation=organisation,
+                status=statuses[status_index],
+                price=price,
+                time_created=time_created,
+                notes=None
+            )
+            shopping_lists.append(shopping_list)
+            item_names = rng.sample(catalog_items, min(len(catalog_items), vary(rng, options['items'])))
+            if custom_item_names[user.id] and rng.random() < 0.3:
+                item_names.append(rng.choice(custom_item_names[user.id]))
+            for item_name in item_names:
+                list_items.append(ShoppingListItem(
+                    id=keys.next(ShoppingListItem),
+                    shopping_list_id=shopping_list.id,
+                    item_name=item_name
+                ))
+            if price is not None:
+                transactions.append(Transaction(
+                    id=keys.next(Transaction),
+                    user_id=user.id,
+                    transaction_datetime=time_created + timedelta(hours=rng.randint(1, 48)),
+                    transaction_amount=price,
+                    detail="List price added."
+                ))
+        for payment_number in range(vary(rng, options['payments'])):
+            transactions.append(Transaction(
+                id=keys.next(Transaction),
+                user_id=user.id,
+                transaction_datetime=start + timedelta(seconds=rng.uniform(0, span)),
+                transaction_amount=-random_amount(rng, 5, 100),
+                detail="Payment made."
+            ))
+
+    for new_transaction in transactions:
+        balances[new_transaction.user_id] += new_transaction.transaction_amount
+    for profile in profiles:
+        profile.balance = balances[profile.user_id]
+
+    for model, rows in (
+        (User, users),
+        (UserProfile, profiles),
+        (Token, tokens),
+        (UserCustomListOption, custom_items),
+        (ShoppingList, shopping_lists),
+        (ShoppingListItem, list_items),
+        (Transaction, transactions),
+    ):
+        model.objects.bulk_create(rows, batch_size=SYNTHETIC_BATCH_SIZE)
+    # a token's created time is always set to now on insert
+    Token.objects.filter(user_id__in=[user.id for user in users]).update(created=start)
+    rebuild_item_demand(organisation)
+
+    return {
+        'users': len(users),
+        'lists': len(shopping_lists),
+        'list_items': len(list_items),
+        'transactions': len(transactions),
+    }
+
+"""
+    - Generate options['organisations'] organisations from options['seed'], calling progress with the number
+      and row counts of each organisation as it is written
+    - Each organisation is written in its own database transaction
+    - Returns the total row counts
+"""
+def generate_synthetic_data(options, progress=None):
+    rng = random.Random(options['seed'])
+    statuses = get_or_create_statuses()
+    # one hash, with a fixed salt so the generated rows don't depend on the time they were made
+    password = make_password(options.get('password', SYNTHETIC_PASSWORD), salt=f"synthetic{options['seed']}")
+    end = SYNTHETIC_START + timedelta(days=options['days'])
+    if settings.USE_TZ:
+        end = timezone.make_aware(end)
+    keys = KeyAllocator(Organisation, User, UserProfile, UserCustomListOption, ShoppingList, ShoppingListItem, Transaction)
+
+    totals = defaultdict(int)
+    for number in range(1, options['organisations'] + 1):
+        with transaction.atomic():
+            counts = generate_organisation(rng, keys, number, options, statuses, password, end)
+        for key, count in counts.items():
+            totals[key] += count
+        if progress is not None:
+            progress(number, counts)
+
+    # the rows were given their keys here, so move any key sequences past them
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), list(keys.next_keys)):
+            cursor.execute(sql)
+    return dict(totals)
+
+# copy the whole default database, which must be SQLite, to a SQLite file at path
+def dump_sqlite(path):
+    if connection.vendor != 'sqlite':
+        raise ValueError(f"Only a SQLite database can be dumped, not {connection.vendor}.")
+    connection.ensure_connection()
+    destination = sqlite3.connect(str(path))
+    try:
+        connection.connection.backup(destination)
+    finally:
+        destination.close()
+
+# replace the whole default database, which must be SQLite, with a copy of the SQLite file at path
+def load_sqlite(path):
+    if connection.vendor != 'sqlite':
+        raise ValueError(f"Only a SQLite database can be loaded, not {connection.vendor}.")
+    connection.ensure_connection()
+    source = sqlite3.connect(str(path))
+    try:
+        source.backup(connection.connection)
+    finally:
+        source.close()
@@ -0,0 +1,107 @@
+import json
+import re
+from django.db import connection
+
+"""
+    - Query plan checks for the api tests
+    - explain returns the plan of a query on the test database as lines of text, on SQLite or PostgreSQL
+    - plan_problems finds what a query shouldn't do at scale: read one of the large tables in full, row by row or
+      through every entry of an index, or sort all of its rows for an ORDER BY that no index serves. A sort of
+      each group of rows an index already orders (SQLite's RIGHT PART OF ORDER BY, PostgreSQL's Incremental Sort)
+      only holds one group at a time, so it isn't a problem.
+    - SQLite plans without table statistics, as if every table were large. On PostgreSQL sequential scans and
+      sorts are switched off while explaining, so they are only planned where no index can be used, however small
+      the test data is.
+"""
+
+# the tables that grow with an organisation's history, which a hot query should never read in full
+LARGE_TABLES = {
+    'auth_user',
+    'authtoken_token',
+    'api_userprofile',
+    'api_shoppinglist',
+    'api_shoppinglistitem',
+    'api_transaction',
+    'api_usercustomlistoption',
+    'api_organisationcustomlistoption',
+    'api_organisationcustomlistgroup',
+    'api_organisationitemdemand',
+}
+
+# the statements that have a plan worth checking
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+# a full scan of a table, or of every entry of one of its indexes
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS "?(\w+)"?)?( USING (?:COVERING )?INDEX \w+)?$')
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+# a table given an alias in django's sql, eg. "api_shoppinglist" U0
+SQL_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)"?')
+# a table a query reads from
+SQL_TABLE = re.compile(r'\b(?:FROM|JOIN) "(\w+)"')
+
+POSTGRESQL_INDEX_SCANS = ('Index Scan', 'Index Only Scan')
+
+def is_explained(sql):
+    return sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS)
+
+# the tables a query reads from
+def query_tables(sql):
+    return set(SQL_TABLE.findall(sql))
+
+# the lines of a postgresql json plan, one for each node, with the condition of each index scan
+def postgresql_plan_lines(node, depth=0):
+    relation = f" on {node['Relation Name']}" if 'Relation Name' in node else ""
+    condition = f" ({node['Index Cond']})" if 'Index Cond' in node else ""
+    yield f"{'  ' * depth}{node['Node Type']}{relation}{condition}"
+    for child in node.get('Plans', []):
+        yield from postgresql_plan_lines(child, depth + 1)
+
+# the plan of a query, as lines of text
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute("SET enable_sort = off")
+            try:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.execute("RESET enable_seqscan")
+                cursor.execute("RESET enable_sort")
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(postgresql_plan_lines(plan[0]['Plan']))
+    raise NotImplementedError(f"Query plans can't be checked on {connection.vendor}.")
+
+# the problems in the plan of a query: the large tables it reads in full, and whether it sorts all of its rows
+def plan_problems(sql, plan_lines):
+    problems = set()
+    if connection.vendor == 'postgresql':
+        for line in plan_lines:
+            node = line.strip()
+            if node.startswith('Seq Scan on '):
+                table = node[len('Seq Scan on '):]
+                if table in LARGE_TABLES:
+                    problems.add(f"a full scan of {table}")
+            elif node.startswith(POSTGRESQL_INDEX_SCANS) and not node.endswith(')'):
+                table = node.rsplit(' on ', 1)[-1]
+                if table in LARGE_TABLES:
+                    problems.add(f"a full index scan of {table}")
+            elif node == 'Sort':
+                problems.add("a sort of every row")
+        return sorted(problems)
+    aliases = {alias: table for table, alias in SQL_ALIAS.findall(sql)}
+    for line in plan_lines:
+        node = line.strip()
+        match = SQLITE_SCAN.match(node)
+        if match:
+            name = match.group(2) or match.group(1)
+            table = aliases.get(name, name)
+            if table in LARGE_TABLES:
+                problems.add(f"a full {'index scan' if match.group(3) else 'scan'} of {table}")
+        elif node == SQLITE_SORT:
+            problems.add("a sort of every row")
+    return sorted(problems)
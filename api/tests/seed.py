@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+from api.catalog import get_default_catalog, create_organisation_catalog
+from api.demand import rebuild_item_demand
+from api.ledger import record_transactions
+from api.models import (
+    Organisation, UserProfile, ListStatus, ShoppingList, ShoppingListItem, UserCustomListOption, Transaction
+)
+
+"""
+    - Deterministic test data for the api tests
+    - seed_organisation builds an organisation whose row counts grow with size: size members, each with size
+      lists of three items and size transactions
+"""
+
+STATUSES = ('CREATED', 'SHOPPED', 'COMPLETE')
+SEED_TIME = timezone.make_aware(datetime(2021, 1, 1, 9, 0))
+
+# create the list statuses the api expects
+def seed_statuses():
+    ListStatus.objects.bulk_create([ListStatus(label=label, rank=rank) for rank, label in enumerate(STATUSES)])
+
+# create an organisation with an admin and size members, returning the objects the tests need
+def seed_organisation(name, size):
+    password = make_password('password')
+    organisation = Organisation.objects.create(organisation_name=name)
+    create_organisation_catalog(organisation, get_default_catalog())
+    catalog_items = [item_name for group in get_default_catalog()['groups'] for item_name in group['items']]
+
+    admin = User.objects.create(username=f"{name}-admin", email=f"admin@{name}.com", password=password)
+    UserProfile.objects.create(user=admin, organisation=organisation, user_type='admin')
+    members = []
+    for member_number in range(size):
+        member = User.objects.create(username=f"{name}-user-{member_number}", email=f"user{member_number}@{name}.com", password=password)
+        UserProfile.objects.create(user=member, organisation=organisation, user_type='user')
+        UserCustomListOption.objects.create(user=member, item_name=f"custom item {member_number}")
+        members.append(member)
+
+    shopping_lists = []
+    for member_number, member in enumerate(members):
+        for list_number in range(size):
+            shopping_lists.append(ShoppingList(
+                user=member,
+                organisation=organisation,
+                status=STATUSES[list_number % 2],
+                price=Decimal(list_number + 1) if list_number % 2 else None,
+                time_created=SEED_TIME + timedelta(minutes=member_number * size + list_number)
+            ))
+    for shopping_list in shopping_lists:
+        shopping_list.save()
+    ShoppingListItem.objects.bulk_create([
+        ShoppingListItem(shopping_list=shopping_list, item_name=catalog_items[(list_number + item_number) % len(catalog_items)])
+        for list_number, shopping_list in enumerate(shopping_lists)
+        for item_number in range(3)
+    ])
+    rebuild_item_demand(organisation)
+
+    record_transactions([
+        Transaction(
+            user=member,
+            transaction_amount=Decimal(transaction_number + 1),
+            transaction_datetime=SEED_TIME + timedelta(hours=transaction_number),
+            detail="List price added."
+        )
+        for member in members
+        for transaction_number in range(size)
+    ])
+
+    return {
+        'organisation': organisation,
+        'admin': admin,
+        'member': members[0],
+        'members': members,
+        'lists': shopping_lists,
+    }
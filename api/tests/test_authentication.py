@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from api.models import UserProfile
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - The cached principal of a token is reused between requests, and dropped as soon as the token, its user or
+      their profile changes
+"""
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class CachedPrincipalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("principals", 1)
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.get(user=self.seed['admin'])
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        # resolve and cache the principal
+        self.assertEqual(self.is_admin(), 200)
+
+    def is_admin(self):
+        response = self.client.post(reverse('api-user-is-admin'))
+        self.last_content = response.json()
+        return response.status_code
+
+    def test_repeat_requests_only_read_the_version(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.is_admin(), 200)
+        self.assertTrue(self.last_content['is_admin'])
+
+    def test_deleted_token(self):
+        self.token.delete()
+        self.assertEqual(self.is_admin(), 401)
+
+    def test_inactive_user(self):
+        admin = User.objects.get(id=self.seed['admin'].id)
+        admin.is_active = False
+        admin.save()
+        self.assertEqual(self.is_admin(), 401)
+
+    def test_profile_change(self):
+        user_profile = UserProfile.objects.get(user=self.seed['admin'])
+        user_profile.user_type = 'user'
+        user_profile.save()
+        self.assertEqual(self.is_admin(), 200)
+        self.assertFalse(self.last_content['is_admin'])
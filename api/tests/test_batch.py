@@ -0,0 +1,44 @@
+from django.test import TestCase, override_settings
+from api.services import dispatch
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - Batch requests: malformed batches are rejected whole, and endpoints that can't be batched fail on their own
+"""
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class BatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("batch", 1)
+
+    def batch(self, data):
+        return dispatch('api-batch', self.seed['admin'], data=data)
+
+    def test_malformed_batches(self):
+        for data in (
+            {},
+            {'requests': 'user-detail/'},
+            {'requests': ['user-detail/']},
+            {'requests': [{'data': {}}]},
+            {'requests': [{'endpoint': 5}]},
+            {'requests': [{'endpoint': 'user-detail/', 'data': 'user_id=1'}]},
+        ):
+            response = self.batch(data)
+            self.assertEqual(response.status_code, 400, data)
+            self.assertTrue(response.json()['error'].startswith("requests must be a list of objects"), response.json())
+
+    def test_endpoints_that_cant_be_batched(self):
+        response = self.batch({'requests': [
+            {'endpoint': 'export/lists/', 'method': 'GET'},
+            {'endpoint': 'batch/', 'data': {'requests': []}},
+            {'endpoint': 'missing/'},
+            {'endpoint': 'generate-list/'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [sub_response['status_code'] for sub_response in response.json()['responses']],
+            [400, 400, 404, 200]
+        )
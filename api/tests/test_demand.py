@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from api.demand import diff_item_demand, get_item_demand, rebuild_item_demand
+from api.models import OrganisationItemDemand, ShoppingList, ShoppingListItem
+from api.services import dispatch
+from api.versions import get_version, lists_scope
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - The stored item demand matches a full recompute after every kind of list and item write
+"""
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class ItemDemandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("demand", 3)
+
+    def setUp(self):
+        self.organisation = self.seed['organisation']
+        self.assertEqual(diff_item_demand(self.organisation), {})
+
+    def created_list(self):
+        return ShoppingList.objects.filter(user=self.seed['member'], status='CREATED').order_by('id').first()
+
+    def demand(self):
+        return {row['item_name']: row['list_count'] for row in get_item_demand(self.organisation)}
+
+    def assertDemandInStep(self):
+        self.assertEqual(diff_item_demand(self.organisation), {})
+
+    def test_create_list(self):
+        response = dispatch('api-create-new-list', self.seed['member'], data={'form_data': {'Snacks': ['Crisps', 'Crisps']}})
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertEqual(self.demand()['Crisps'], 1)
+        self.assertDemandInStep()
+
+    def test_update_lists_status(self):
+        response = dispatch('api-update-lists', self.seed['admin'], data={'lists': [
+            {'list_id': self.created_list().id, 'status': 'SHOPPED'}
+        ]})
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertDemandInStep()
+
+    def test_update_list_status(self):
+        response = dispatch('api-update-list', self.seed['admin'], data={
+            'list_id': self.created_list().id, 'price': '2.50', 'status': 'SHOPPED', 'notes': None
+        })
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertDemandInStep()
+
+    def test_save_list_status(self):
+        shopping_list = ShoppingList.objects.filter(user=self.seed['member'], status='SHOPPED').first()
+        shopping_list.status = 'CREATED'
+        shopping_list.save()
+        self.assertDemandInStep()
+        shopping_list.status = 'COMPLETE'
+        shopping_list.save()
+        self.assertDemandInStep()
+
+    def test_delete_list(self):
+        self.created_list().delete()
+        self.assertDemandInStep()
+
+    def test_delete_user(self):
+        User.objects.get(id=self.seed['member'].id).delete()
+        self.assertDemandInStep()
+
+    def test_edit_items(self):
+        shopping_list = self.created_list()
+        item = ShoppingListItem.objects.filter(shopping_list=shopping_list).first()
+        item.item_name = 'Crisps'
+        item.save()
+        self.assertEqual(self.demand()['Crisps'], 1)
+        self.assertDemandInStep()
+        ShoppingListItem.objects.create(shopping_list=shopping_list, item_name='Crisps')
+        self.assertEqual(self.demand()['Crisps'], 1)
+        self.assertDemandInStep()
+        ShoppingListItem.objects.filter(shopping_list=shopping_list, item_name='Crisps').delete()
+        self.assertNotIn('Crisps', self.demand())
+        self.assertDemandInStep()
+
+    def test_rebuild_repairs_drift_and_moves_the_lists_version(self):
+        OrganisationItemDemand.objects.filter(organisation=self.organisation).update(list_count=99)
+        self.assertNotEqual(diff_item_demand(self.organisation), {})
+        version = get_version(lists_scope(self.organisation.id))
+        rebuild_item_demand(self.organisation)
+        self.assertDemandInStep()
+        self.assertGreater(get_version(lists_scope(self.organisation.id)), version)
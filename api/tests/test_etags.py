@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - Conditional GETs of the read endpoints: an unchanged ETag gets a 304, and a write to the data an endpoint
+      shows gets a new ETag and a full response
+"""
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class ETagTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("etags", 2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.get(user=self.seed['admin']).key}")
+
+    def get(self, name, data, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse(name), data, **headers)
+
+    def check_user_change(self, name, data, change):
+        response = self.get(name, data)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.get(name, data, etag).status_code, 304)
+
+        member = User.objects.get(id=self.seed['member'].id)
+        change(member)
+        member.save()
+        response = self.get(name, data, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response.json()
+
+    def test_user_detail_email_change(self):
+        def change(member):
+            member.email = 'changed@etags.com'
+        content = self.check_user_change('api-user-detail', {'user_id': self.seed['member'].id}, change)
+        self.assertIn('changed@etags.com', str(content))
+
+    def test_get_lists_username_change(self):
+        def change(member):
+            member.username = 'etags-renamed'
+        content = self.check_user_change('api-get-lists', {}, change)
+        self.assertIn('etags-renamed', content['lists'])
+
+    def test_login_keeps_the_etag(self):
+        response = self.get('api-get-lists', {})
+        member = User.objects.get(id=self.seed['member'].id)
+        member.save(update_fields=['last_login'])
+        self.assertEqual(self.get('api-get-lists', {}, response['ETag']).status_code, 304)
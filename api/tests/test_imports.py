@@ -0,0 +1,124 @@
+from decimal import Decimal
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from api.imports import PasswordHasherPool, import_payments, import_users, read_rows
+from api.ledger import find_balance_drift
+from api.models import Transaction, UserProfile
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - Imports report every invalid row by line and write nothing unless the whole file is valid
+    - A dry run only checks the file, and imported users get hashed passwords, profiles and tokens
+"""
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("imports", 2)
+        cls.other_seed = seed_organisation("imports-elsewhere", 1)
+
+    def import_file(self, import_rows, lines, import_format='csv', dry_run=False):
+        return import_rows(self.seed['organisation'], read_rows(lines, import_format), dry_run=dry_run)
+
+    def balances(self):
+        return dict(UserProfile.objects.values_list('user_id', 'balance'))
+
+    def test_invalid_payments_are_reported_by_line(self):
+        member = self.seed['member']
+        balances = self.balances()
+        transaction_count = Transaction.objects.count()
+        report = self.import_file(import_payments, [
+            "user_id,username,payment,date,detail\n",
+            f"{member.id},,5.00,2021-02-01,Paid\n",
+            f"{self.other_seed['member'].id},,5.00,,\n",
+            ",nobody,5.00,,\n",
+            ",,5.00,,\n",
+            f"{member.id},,1.005,,\n",
+            f",{member.username},5.00,yesterday,\n",
+            f"{member.id},,5.00,,{'x' * 300}\n",
+        ])
+        self.assertEqual(report['imported'], 0)
+        self.assertEqual(report['errors'], [
+            {'line': 3, 'error': f"No user with id {self.other_seed['member'].id} at your organisation."},
+            {'line': 4, 'error': "No user with username nobody at your organisation."},
+            {'line': 5, 'error': "A user_id or username is required."},
+            {'line': 6, 'error': "Invalid payment: 1.005"},
+            {'line': 7, 'error': "Invalid date: yesterday"},
+            {'line': 8, 'error': "The detail is too long."},
+        ])
+        self.assertEqual(Transaction.objects.count(), transaction_count)
+        self.assertEqual(self.balances(), balances)
+
+    def test_lines_that_arent_json_objects(self):
+        report = self.import_file(import_payments, [
+            f'{{"user_id": {self.seed["member"].id}, "payment": "5.00"}}\n',
+            "\n",
+            "[1, 2]\n",
+            "{not json\n",
+        ], import_format='ndjson')
+        self.assertEqual(report['errors'], [
+            {'line': 3, 'error': "The line is not a json object."},
+            {'line': 4, 'error': "The line is not a json object."},
+        ])
+
+    def test_payments_dry_run_and_import(self):
+        member = self.seed['member']
+        balance = self.balances()[member.id]
+        lines = ["username,payment\n", f"{member.username},2.50\n", f"{member.username},1.25\n"]
+        report = self.import_file(import_payments, lines, dry_run=True)
+        self.assertEqual((report['rows'], report['imported'], report['errors']), (2, 0, []))
+        self.assertEqual(self.balances()[member.id], balance)
+
+        report = self.import_file(import_payments, lines)
+        self.assertEqual((report['rows'], report['imported'], report['errors']), (2, 2, []))
+        self.assertEqual(self.balances()[member.id], balance - Decimal('3.75'))
+        self.assertEqual(list(find_balance_drift()), [])
+
+    def test_invalid_users_are_reported_by_line(self):
+        user_count = User.objects.count()
+        report = self.import_file(import_users, [
+            "username,email,password,user_type\n",
+            "new-user,new@imports.com,password,user\n",
+            "no-password,nopassword@imports.com,,\n",
+            "bad-email,not-an-email,password,\n",
+            f"{self.seed['member'].username},taken@imports.com,password,\n",
+            "new-user,again@imports.com,password,\n",
+            "bad-type,badtype@imports.com,password,owner\n",
+        ])
+        self.assertEqual(report['imported'], 0)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4, 5, 6, 7])
+        self.assertEqual(report['errors'][0]['error'], "A username, email and password are required.")
+        self.assertEqual(report['errors'][2]['error'], f"The username {self.seed['member'].username} is already taken.")
+        self.assertEqual(report['errors'][3]['error'], "The username new-user appears more than once.")
+        self.assertEqual(report['errors'][4]['error'], "Invalid user_type: owner")
+        self.assertEqual(User.objects.count(), user_count)
+
+    def test_users_dry_run_and_import(self):
+        lines = [
+            "username,email,password,user_type\n",
+            "first-import,first@imports.com,first-password,\n",
+            "second-import,second@imports.com,second-password,admin\n",
+        ]
+        report = self.import_file(import_users, lines, dry_run=True)
+        self.assertEqual((report['rows'], report['imported'], report['errors']), (2, 0, []))
+        self.assertFalse(User.objects.filter(username='first-import').exists())
+
+        report = self.import_file(import_users, lines)
+        self.assertEqual((report['rows'], report['imported'], report['errors']), (2, 2, []))
+        for username, password, user_type in (('first-import', 'first-password', 'user'), ('second-import', 'second-password', 'admin')):
+            new_user = User.objects.get(username=username)
+            self.assertTrue(check_password(password, new_user.password))
+            self.assertEqual(new_user.userprofile.organisation, self.seed['organisation'])
+            self.assertEqual(new_user.userprofile.user_type, user_type)
+            self.assertTrue(Token.objects.filter(user=new_user).exists())
+
+    def test_hasher_pool(self):
+        passwords = ['one', 'two', 'three']
+        for hashed_passwords in (PasswordHasherPool(workers=2).hash(passwords), PasswordHasherPool().hash(passwords[:1])):
+            self.assertEqual(len(hashed_passwords), len(set(hashed_passwords)))
+            for password, hashed_password in zip(passwords, hashed_passwords):
+                self.assertTrue(check_password(password, hashed_password))
@@ -0,0 +1,54 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from api.ledger import find_balance_drift, reconcile_balances, record_transactions
+from api.models import Transaction, UserProfile
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - The stored balances stay equal to the sum of the ledger, and drift is found and repaired
+"""
+
+class LedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("ledger", 2)
+
+    def profile(self):
+        return UserProfile.objects.get(user=self.seed['member'])
+
+    def new_transaction(self, amount):
+        return Transaction(
+            user=self.seed['member'],
+            transaction_amount=amount,
+            transaction_datetime=timezone.now(),
+            detail="Test transaction."
+        )
+
+    def test_amounts_are_rounded_to_cents(self):
+        balance = self.profile().balance
+        transactions = [self.new_transaction(Decimal('1.005')), self.new_transaction(Decimal('2.347'))]
+        record_transactions(transactions)
+        self.assertEqual([transaction.transaction_amount for transaction in transactions], [Decimal('1.00'), Decimal('2.35')])
+        self.assertEqual(self.profile().balance, balance + Decimal('3.35'))
+        self.assertEqual(list(find_balance_drift()), [])
+
+    def test_drift_is_found_and_reconciled(self):
+        UserProfile.objects.filter(user=self.seed['member']).update(balance=Decimal('123.45'))
+        drifted = list(find_balance_drift())
+        self.assertEqual([user_profile.user_id for user_profile in drifted], [self.seed['member'].id])
+        self.assertEqual(reconcile_balances(drifted), 1)
+        self.assertEqual(list(find_balance_drift()), [])
+
+    def test_reconcile_balances_command(self):
+        call_command('reconcile_balances', stdout=StringIO())
+        UserProfile.objects.filter(user=self.seed['member']).update(balance=Decimal('123.45'))
+        with self.assertRaises(CommandError):
+            call_command('reconcile_balances', stdout=StringIO(), stderr=StringIO())
+        call_command('reconcile_balances', '--fix', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(list(find_balance_drift()), [])
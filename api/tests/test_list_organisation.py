@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from api.demand import diff_item_demand
+from api.models import ShoppingList, ShoppingListItem, UserProfile
+from api.versions import get_version, lists_scope
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - The organisation stored on a list follows its user's profile, and the item demand moves with it
+"""
+
+class ListOrganisationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("home", 2)
+        cls.other_seed = seed_organisation("away", 1)
+
+    def organisation_ids(self, user):
+        return set(ShoppingList.objects.filter(user=user).values_list('organisation_id', flat=True))
+
+    def test_a_list_saved_without_an_organisation_takes_its_users(self):
+        shopping_list = ShoppingList.objects.create(user=self.seed['member'], status='CREATED', time_created=timezone.now())
+        self.assertEqual(shopping_list.organisation_id, self.seed['organisation'].id)
+
+    def test_lists_move_with_the_profile(self):
+        member = self.seed['member']
+        old_version = get_version(lists_scope(self.seed['organisation'].id))
+        user_profile = UserProfile.objects.get(user=member)
+        user_profile.organisation = self.other_seed['organisation']
+        user_profile.save()
+
+        self.assertEqual(self.organisation_ids(member), {self.other_seed['organisation'].id})
+        self.assertGreater(get_version(lists_scope(self.seed['organisation'].id)), old_version)
+        for organisation in (self.seed['organisation'], self.other_seed['organisation']):
+            self.assertEqual(diff_item_demand(organisation), {})
+
+    def test_a_new_profile_picks_up_its_users_lists(self):
+        superuser = User.objects.create(username='home-superuser', email='superuser@home.com')
+        shopping_list = ShoppingList.objects.create(user=superuser, status='CREATED', time_created=timezone.now())
+        ShoppingListItem.objects.create(shopping_list=shopping_list, item_name='Crisps')
+        self.assertIsNone(shopping_list.organisation_id)
+
+        UserProfile.objects.create(user=superuser, organisation=self.seed['organisation'], user_type='admin')
+        self.assertEqual(self.organisation_ids(superuser), {self.seed['organisation'].id})
+        self.assertEqual(diff_item_demand(self.seed['organisation']), {})
@@ -0,0 +1,190 @@
+import csv
+import json
+import os
+import re
+from pathlib import Path
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from api import urls as api_urls
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - Query budgets for every endpoint in api.urls
+    - Each endpoint is called against organisations of several sizes, with cold caches, and must run exactly
+      its declared number of queries at every size. A query count that grows with the data (an N+1) fails here.
+    - The response of each endpoint at SNAPSHOT_SIZE is compared with a stored snapshot in snapshots/, so an
+      optimisation can be shown not to change what an endpoint returns. A missing snapshot fails. Run with
+      UPDATE_SNAPSHOTS=1 to write the snapshots of a new endpoint, or rewrite them after an intended change.
+"""
+
+SIZES = (1, 4, 12)
+SNAPSHOT_SIZE = 4
+SNAPSHOTS_DIR = Path(__file__).resolve().parent / 'snapshots'
+
+# the keys whose values are database ids, which differ between databases and runs
+ID_KEYS = {'id', 'user_id', 'list_id', 'item_id', 'shopping_list_id', 'organisation', 'user', 'list_ids'}
+
+"""
+    - Every api endpoint, by url name: who calls it, how, with what data, the status code it should return and
+      its query budget
+    - data is called with the seeded organisation, and returns the request data
+"""
+CASES = {
+    'api-get-all-users': ('admin', 'get', lambda seed: {}, 200, 3),
+    'api-register-user': ('admin', 'post', lambda seed: {
+        'username': f"{seed['organisation']}-new",
+        'email': 'new@example.com',
+        'password': 'password',
+        'admin_id': seed['admin'].userprofile.id,
+        'user_type': 'user'
+    }, 200, 13),
+    'api-register-organisation': ('admin', 'post', lambda seed: {
+        'username': f"{seed['organisation']}-new-admin",
+        'email': f"new-admin@{seed['organisation']}.com",
+        'password': 'password',
+        'organisation_name': f"{seed['organisation']} two"
+    }, 200, 21),
+    'api-user-is-admin': ('admin', 'post', lambda seed: {}, 200, 2),
+    'api-get-custom-items': ('admin', 'post', lambda seed: {}, 200, 5),
+    'api-custom-items': ('member', 'post', lambda seed: {'item_id': None, 'item_name': 'Tea', 'price': None}, 200, 6),
+    'api-get-groups': ('admin', 'post', lambda seed: {}, 200, 3),
+    'api-add-group': ('admin', 'post', lambda seed: {'group_name': 'Snacks'}, 200, 6),
+    'api-get-shopping-list-items': ('member', 'post', lambda seed: {}, 200, 6),
+    'api-create-new-list': ('member', 'post', lambda seed: {'form_data': {'Fruit': ['Apples', 'Bananas']}}, 200, 14),
+    'api-create-new-lists': ('admin', 'post', lambda seed: {'lists': [
+        {'user_id': member.id, 'form_data': {'Fruit': ['Apples']}} for member in seed['members']
+    ]}, 200, 15),
+    'api-get-lists': ('admin', 'post', lambda seed: {}, 200, 3),
+    'api-list-detail': ('admin', 'post', lambda seed: {'list_id': seed['lists'][0].id}, 200, 7),
+    'api-update-list': ('admin', 'post', lambda seed: {
+        'list_id': seed['lists'][0].id, 'price': '9.99', 'status': 'SHOPPED', 'notes': 'shopped'
+    }, 200, 21),
+    'api-update-lists': ('admin', 'post', lambda seed: {'lists': [
+        {'list_id': shopping_list.id, 'price': '9.99', 'status': 'COMPLETE', 'notes': 'settled'}
+        for shopping_list in seed['lists']
+    ]}, 200, 21),
+    'api-generate-list': ('admin', 'post', lambda seed: {'group_items': True}, 200, 3),
+    'api-user-detail': ('admin', 'post', lambda seed: {'user_id': seed['member'].id}, 200, 7),
+    'api-register-payment': ('admin', 'post', lambda seed: {'user_id': seed['member'].id, 'payment': '5'}, 200, 12),
+    'api-import-payments': ('admin', 'multipart', lambda seed: {'file': SimpleUploadedFile(
+        'payments.csv',
+        ("username,payment,date\n" + "".join(f"{member.username},1.50,2021-02-01\n" for member in seed['members'])).encode()
+    )}, 200, 12),
+    'api-import-users': ('admin', 'multipart', lambda seed: {'file': SimpleUploadedFile(
+        'users.ndjson',
+        "".join(
+            json.dumps({'username': f"{seed['organisation']}-import-{number}", 'email': f"import{number}@example.com", 'password': 'password'}) + "\n"
+            for number in range(len(seed['members']))
+        ).encode()
+    )}, 200, 9),
+    'api-export-transactions': ('admin', 'get', lambda seed: {}, 200, 3),
+    'api-export-lists': ('admin', 'get', lambda seed: {'export_format': 'ndjson'}, 200, 3),
+    'api-export-list-items': ('admin', 'get', lambda seed: {'start': '2021-01-01'}, 200, 3),
+    'api-get-item': ('admin', 'post', lambda seed: {'item_id': seed['organisation'].organisationcustomlistoption_set.order_by('id').first().id}, 200, 6),
+    'api-batch': ('admin', 'post', lambda seed: {'requests': [
+        {'endpoint': 'generate-list/'},
+        {'endpoint': 'user-detail/', 'data': {'user_id': seed['member'].id}},
+    ]}, 200, 8),
+}
+
+# replace the values that differ between databases and runs
+def normalise(value, key=None):
+    if isinstance(value, dict):
+        return {item_key: normalise(item_value, item_key) for item_key, item_value in value.items()}
+    if isinstance(value, list):
+        return [normalise(item, key) for item in value]
+    if key in ID_KEYS and isinstance(value, (int, str)):
+        return '<id>'
+    if key == 'next_cursor' and value:
+        return '<cursor>'
+    if key in ('list_name', 'user') and isinstance(value, str):
+        return re.sub(r'\d+$', '<id>', value)
+    return value
+
+# the content of a response as json, reading a streamed export to the end as a list of rows
+def response_content(response):
+    if response.streaming:
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        if response['Content-Type'] == 'text/csv':
+            return list(csv.DictReader(lines))
+        return [json.loads(line) for line in lines]
+    if response.get('Content-Type', '').startswith('application/json'):
+        return response.json()
+    return response.content.decode()
+
+# the path of an endpoint, by url name
+def endpoint_path(name):
+    pattern = next(pattern for pattern in api_urls.urlpatterns if pattern.name == name)
+    return f"/api/{pattern.pattern}"
+
+# call an endpoint as one of a seeded organisation's users, returning the status code, content and the queries run
+def call_endpoint(name, seed, case):
+    actor, method, data, expected_status, budget = case
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.get(user=seed[actor]).key}")
+    path = endpoint_path(name)
+    path_data = data(seed)
+    # start every request with cold caches, so the queries don't depend on the requests before it
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        if method == 'multipart':
+            response = client.post(path, path_data, format='multipart')
+        elif method == 'get':
+            response = client.get(path, path_data)
+        else:
+            response = client.post(path, path_data, format='json')
+        content = response_content(response)
+    return response.status_code, content, queries.captured_queries
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seeds = {size: seed_organisation(f"farm{size}", size) for size in SIZES}
+
+    def check_snapshot(self, name, content):
+        snapshot_path = SNAPSHOTS_DIR / f"{name}.json"
+        content = normalise(content)
+        if os.environ.get('UPDATE_SNAPSHOTS'):
+            SNAPSHOTS_DIR.mkdir(exist_ok=True)
+            snapshot_path.write_text(json.dumps(content, indent=2, sort_keys=True, default=str) + "\n")
+            return
+        self.assertTrue(snapshot_path.exists(), f"{name} has no snapshot, run with UPDATE_SNAPSHOTS=1 to write {snapshot_path.name}")
+        expected = json.loads(snapshot_path.read_text())
+        self.assertEqual(json.loads(json.dumps(content, default=str)), expected, f"{name} no longer matches {snapshot_path.name}")
+
+    def check_endpoint(self, name):
+        case = CASES[name]
+        budget = case[4]
+        query_counts = {}
+        for size in SIZES:
+            status_code, content, queries = call_endpoint(name, self.seeds[size], case)
+            self.assertEqual(status_code, case[3], f"{name} at size {size}: {content}")
+            query_counts[size] = len(queries)
+            if size == SNAPSHOT_SIZE:
+                self.check_snapshot(name, content)
+        self.assertEqual(
+            query_counts,
+            {size: budget for size in SIZES},
+            f"{name} should run {budget} queries at every size"
+        )
+
+    def test_every_endpoint_has_a_budget(self):
+        names = {pattern.name for pattern in api_urls.urlpatterns if isinstance(pattern, URLPattern)}
+        self.assertEqual(names - set(CASES), set(), "declare a query budget for every new endpoint")
+        self.assertEqual(set(CASES) - names, set())
+
+# add a test for each endpoint, so a failure names the endpoint
+for case_name in CASES:
+    def test_endpoint(self, case_name=case_name):
+        self.check_endpoint(case_name)
+    setattr(QueryBudgetTests, f"test_{case_name.replace('-', '_')}", test_endpoint)
+del case_name, test_endpoint
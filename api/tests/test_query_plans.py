@@ -0,0 +1,71 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, override_settings
+from api.pagination import encode_cursor
+from .explain import explain, plan_problems, is_explained, query_tables
+from .seed import seed_statuses, seed_organisation
+from .test_query_budgets import CASES, call_endpoint
+
+"""
+    - Query plan checks for every endpoint in api.urls
+    - Each endpoint is called as in the query budget tests, and every SELECT, UPDATE and DELETE it runs is
+      explained on the test database. A plan that reads one of the large tables in full, or sorts every row it
+      reads, fails, naming the query, so a missing index shows up here before it shows up in production.
+    - The paginated endpoints are also called for a later page, and as a member, which run different queries
+    - Runs on SQLite and on PostgreSQL, eg. with DATABASES pointing at a local postgres server
+"""
+
+# the size of the seeded organisation. Plans don't depend on it, the endpoints just need data to work with.
+PLAN_SIZE = 4
+
+# calls of the paginated endpoints beyond their CASES entry: (url name, case), with the case as in CASES
+PAGE_CASES = {
+    'api-get-lists-next-page': ('api-get-lists', ('admin', 'post', lambda seed: {
+        'cursor': encode_cursor(seed['lists'][-1].time_created, seed['lists'][-1].id)
+    }, 200, None)),
+    'api-get-lists-member': ('api-get-lists', ('member', 'post', lambda seed: {}, 200, None)),
+    'api-get-all-users-next-page': ('api-get-all-users', ('admin', 'get', lambda seed: {
+        'cursor': encode_cursor(seed['admin'].id)
+    }, 200, None)),
+}
+
+# the sorts no index can serve, by endpoint and a table the sorting query reads, with why each is bounded
+ALLOWED_SORTS = {
+    ('api-generate-list', 'api_organisationitemdemand'):
+        "orders one row for each item the organisation's lists hold, by its catalog group",
+    ('api-create-new-lists', 'api_shoppinglist'):
+        "orders only the lists just inserted, to read their ids back on databases that don't return them",
+}
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), "query plans are only checked on SQLite and PostgreSQL")
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("plans", PLAN_SIZE)
+
+    def check_plans(self, name, url_name, case):
+        status_code, content, queries = call_endpoint(url_name, self.seed, case)
+        self.assertEqual(status_code, case[3], f"{name}: {content}")
+        for query in queries:
+            if not is_explained(query['sql']):
+                continue
+            plan_lines = explain(query['sql'])
+            problems = plan_problems(query['sql'], plan_lines)
+            if any((url_name, table) in ALLOWED_SORTS for table in query_tables(query['sql'])):
+                problems = [problem for problem in problems if problem != "a sort of every row"]
+            self.assertEqual(
+                problems,
+                [],
+                f"{name} plans {', '.join(problems)}:\n{query['sql']}\n" + "\n".join(plan_lines)
+            )
+
+# add a test for each endpoint and page case, so a failure names it
+PLAN_CASES = {**{name: (name, case) for name, case in CASES.items()}, **PAGE_CASES}
+for case_name in PLAN_CASES:
+    def test_endpoint(self, case_name=case_name):
+        self.check_plans(case_name, *PLAN_CASES[case_name])
+    setattr(QueryPlanTests, f"test_{case_name.replace('-', '_')}", test_endpoint)
+del case_name, test_endpoint
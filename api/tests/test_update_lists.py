@@ -0,0 +1,100 @@
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from api.models import ShoppingList, UserProfile
+from api.services import dispatch
+from .seed import seed_statuses, seed_organisation
+
+"""
+    - Behaviour of UpdateList and UpdateLists: what an update writes, who may make it, and the errors returned
+      for invalid entries
+"""
+
+# prices that don't fit a list price and a Transaction
+INVALID_PRICES = ('NaN', 'Infinity', '-Infinity', '99999999', '1.005', 'abc', None)
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=0)
+class UpdateListsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_statuses()
+        cls.seed = seed_organisation("updates", 2)
+
+    def setUp(self):
+        # the first seeded list of each member is CREATED and has no price
+        self.shopping_list = ShoppingList.objects.filter(user=self.seed['member'], status='CREATED').order_by('id').first()
+
+    def balance(self):
+        return UserProfile.objects.get(user=self.seed['member']).balance
+
+    def test_invalid_prices_are_entry_errors(self):
+        balance = self.balance()
+        for price in INVALID_PRICES:
+            response = dispatch('api-update-lists', self.seed['admin'], data={'lists': [
+                {'list_id': self.shopping_list.id, 'price': price}
+            ]})
+            self.assertEqual(response.status_code, 400, price)
+            self.assertEqual(response.json()['errors'], [
+                {'index': 0, 'list_id': self.shopping_list.id, 'error': f"Invalid price: {price}"}
+            ])
+        self.shopping_list.refresh_from_db()
+        self.assertIsNone(self.shopping_list.price)
+        self.assertEqual(self.balance(), balance)
+
+    def test_invalid_prices_are_rejected_by_update_list(self):
+        balance = self.balance()
+        for price in INVALID_PRICES:
+            response = dispatch('api-update-list', self.seed['admin'], data={
+                'list_id': self.shopping_list.id, 'price': price, 'status': 'CREATED', 'notes': None
+            })
+            self.assertEqual(response.status_code, 400, price)
+            self.assertEqual(response.json()['error'], f"Invalid price: {price}")
+        self.shopping_list.refresh_from_db()
+        self.assertIsNone(self.shopping_list.price)
+        self.assertEqual(self.balance(), balance)
+
+    def test_price_is_added_to_the_balance(self):
+        balance = self.balance()
+        response = dispatch('api-update-lists', self.seed['admin'], data={'lists': [
+            {'list_id': self.shopping_list.id, 'price': '1.25'}
+        ]})
+        self.assertEqual(response.status_code, 200, response.json())
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.price, Decimal('1.25'))
+        self.assertEqual(self.balance(), balance + Decimal('1.25'))
+
+    def test_invalid_entries_are_reported_and_nothing_is_written(self):
+        shopped_list = ShoppingList.objects.filter(user=self.seed['member'], status='SHOPPED').first()
+        other_list = ShoppingList.objects.filter(user=self.seed['members'][1], status='CREATED').first()
+        ShoppingList.objects.filter(id=other_list.id).update(status='LOST')
+        other_seed = seed_organisation("elsewhere", 1)
+        response = dispatch('api-update-lists', self.seed['admin'], data={'lists': [
+            {'list_id': self.shopping_list.id, 'notes': 'kept'},
+            {'list_id': self.shopping_list.id, 'notes': 'again'},
+            {'list_id': other_seed['lists'][0].id, 'notes': 'elsewhere'},
+            {'list_id': shopped_list.id, 'status': 'PACKED'},
+            {'list_id': other_list.id, 'status': 'SHOPPED'},
+            {'list_id': shopped_list.id, 'status': 'CREATED'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(error['index'], error['error']) for error in response.json()['errors']], [
+            (1, "List appears more than once."),
+            (2, "List not found."),
+            (3, "Unknown status: PACKED"),
+            (4, "The list has an unknown status: LOST"),
+            (5, "A SHOPPED list can't be moved back to CREATED."),
+        ])
+        self.shopping_list.refresh_from_db()
+        self.assertIsNone(self.shopping_list.notes)
+
+    def test_only_admins_can_update_lists(self):
+        response = dispatch('api-update-lists', self.seed['member'], data={'lists': [
+            {'list_id': self.shopping_list.id, 'notes': 'mine'}
+        ]})
+        self.assertEqual(response.status_code, 401)
+        response = dispatch('api-update-list', self.seed['member'], data={
+            'list_id': self.shopping_list.id, 'price': '1.00', 'status': 'CREATED', 'notes': 'mine'
+        })
+        self.assertEqual(response.status_code, 401)
+        self.shopping_list.refresh_from_db()
+        self.assertIsNone(self.shopping_list.notes)
@@ -10,13 +10,21 @@ from .views import (
     AddGroup,
     GetShoppingListItems,
     CreateNewShoppingList,
+    CreateNewShoppingLists,
     GetLists,
     ListDetailView,
     UpdateList,
+    UpdateLists,
     GenerateList,
     UserDetail,
     RegisterPayment,
-    GetCustomItem
+    ImportPayments,
+    ImportUsers,
+    ExportTransactions,
+    ExportLists,
+    ExportListItems,
+    GetCustomItem,
+    Batch
 )
 
 urlpatterns = [
@@ -30,11 +38,19 @@ urlpatterns = [
     path(AddGroup.endpoint_name, AddGroup.as_view(), name='api-add-group'),
     path(GetShoppingListItems.endpoint_name, GetShoppingListItems.as_view(), name='api-get-shopping-list-items'),
     path(CreateNewShoppingList.endpoint_name, CreateNewShoppingList.as_view(), name='api-create-new-list'),
+    path(CreateNewShoppingLists.endpoint_name, CreateNewShoppingLists.as_view(), name='api-create-new-lists'),
     path(GetLists.endpoint_name, GetLists.as_view(), name='api-get-lists'),
     path(ListDetailView.endpoint_name, ListDetailView.as_view(), name='api-list-detail'),
     path(UpdateList.endpoint_name, UpdateList.as_view(), name='api-update-list'),
+    path(UpdateLists.endpoint_name, UpdateLists.as_view(), name='api-update-lists'),
     path(GenerateList.endpoint_name, GenerateList.as_view(), name='api-generate-list'),
     path(UserDetail.endpoint_name, UserDetail.as_view(), name='api-user-detail'),
     path(RegisterPayment.endpoint_name, RegisterPayment.as_view(), name='api-register-payment'),
-    path(GetCustomItem.endpoint_name, GetCustomItem.as_view(), name='api-get-item')
+    path(ImportPayments.endpoint_name, ImportPayments.as_view(), name='api-import-payments'),
+    path(ImportUsers.endpoint_name, ImportUsers.as_view(), name='api-import-users'),
+    path(ExportTransactions.endpoint_name, ExportTransactions.as_view(), name='api-export-transactions'),
+    path(ExportLists.endpoint_name, ExportLists.as_view(), name='api-export-lists'),
+    path(ExportListItems.endpoint_name, ExportListItems.as_view(), name='api-export-list-items'),
+    path(GetCustomItem.endpoint_name, GetCustomItem.as_view(), name='api-get-item'),
+    path(Batch.endpoint_name, Batch.as_view(), name='api-batch')
 ]
\ No newline at end of file
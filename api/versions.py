@@ -0,0 +1,69 @@
+import hashlib
+from django.db.models import F
+from .models import UserProfile, VersionStamp
+
+"""
+    - Cheap version stamps for cached and conditional reads
+    - A scope (eg. one organisation's catalog) has a version number that is bumped in the same database
+      transaction as every write to the data it covers. Reads can key caches and ETags on the version
+      instead of on the data itself.
+    - The stamps are stored in the database, so every worker process sees the same versions
+"""
+
+# the scope covering an organisation's custom groups and items
+def catalog_scope(organisation_id):
+    return f"catalog:{organisation_id}"
+
+# the scope covering an organisation's shopping lists, list items and transactions
+def lists_scope(organisation_id):
+    return f"lists:{organisation_id}"
+
+# the scope covering one user's custom items
+def user_items_scope(user_id):
+    return f"user-items:{user_id}"
+
+# the scope covering the principal (token, user, profile and organisation) resolved from an api token. The key
+# is hashed, so the token itself isn't stored again.
+def token_scope(token_key):
+    return f"token:{hashlib.sha1(token_key.encode()).hexdigest()}"
+
+# get the scopes with the given names for the user making a request
+def principal_scopes(names, user_profile):
+    scopes = {
+        'catalog': lambda: catalog_scope(user_profile.organisation_id),
+        'lists': lambda: lists_scope(user_profile.organisation_id),
+        'user-items': lambda: user_items_scope(user_profile.user_id),
+    }
+    return [scopes[name]() for name in names]
+
+# get the current versions of the given scopes, in one query
+def get_versions(scopes):
+    versions = dict(VersionStamp.objects.filter(scope__in=scopes).values_list('scope', 'version'))
+    return [versions.get(scope, 0) for scope in scopes]
+
+# get the current version of a scope
+def get_version(scope):
+    return get_versions([scope])[0]
+
+# move scopes to a new version
+def bump_versions(scopes):
+    scopes = set(scopes)
+    if not scopes:
+        return
+    VersionStamp.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+    # start a version for any scope that hasn't been written before
+    VersionStamp.objects.bulk_create(
+        [VersionStamp(scope=scope, version=1) for scope in scopes],
+        ignore_conflicts=True
+    )
+
+# move a scope to a new version
+def bump_version(scope):
+    bump_versions([scope])
+
+# move the lists scopes of the organisations the given users belong to to a new version
+def bump_user_lists_versions(user_ids):
+    organisation_ids = UserProfile.objects.filter(
+        user_id__in=user_ids
+    ).values_list('organisation_id', flat=True).distinct()
+    bump_versions([lists_scope(organisation_id) for organisation_id in organisation_ids])
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+
+"""
+    - Run the benchmark suite: python -m benchmarks
+    - Runs against a test database, created and destroyed like manage.py test does, so the project's own
+      database is never touched
+    - Exits with status 1 if any target regressed beyond --tolerance against the baseline
+"""
+
+def main(argv=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopping_list_api.settings')
+    import django
+    django.setup()
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+    from . import suite
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Time the hot api paths against a stored baseline.")
+    parser.add_argument('--sizes', nargs='+', choices=list(suite.SIZES), default=list(suite.SIZES), help="The sizes to run.")
+    parser.add_argument('--targets', nargs='+', choices=list(suite.TARGETS), help="Only run these targets.")
+    parser.add_argument('--repeat', type=int, default=5, help="The number of timed calls of each target.")
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.5,
+        help="How far above its baseline a target's median can be before it counts as a regression, eg. 0.5 for 50%%."
+    )
+    parser.add_argument('--baseline', default=str(suite.BASELINE_PATH), help="The baseline file.")
+    parser.add_argument('--update-baseline', action='store_true', help="Store the results as the new baseline.")
+    parser.add_argument('--no-fixtures', action='store_true', help="Generate the data of every size again.")
+    options = parser.parse_args(argv)
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        results = {}
+        for size in options.sizes:
+            suite.prepare_size(size, use_fixtures=not options.no_fixtures)
+            results[size] = {
+                'rows': suite.row_counts(),
+                'targets': suite.run_targets(options.repeat, options.targets),
+            }
+            for name, timing in results[size]['targets'].items():
+                print(f"{size:>5} {name:<24} {timing['median_ms']:>10.2f} ms")
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+    if options.update_baseline:
+        suite.write_baseline(results, options.baseline)
+        print(f"Stored the results as the baseline in {options.baseline}.")
+        return 0
+
+    regressions = 0
+    for size, name, baseline_median, median, change, regressed in suite.compare(
+        results, suite.read_baseline(options.baseline), options.tolerance
+    ):
+        if baseline_median is None:
+            print(f"{size:>5} {name:<24} no baseline")
+            continue
+        print(f"{size:>5} {name:<24} {baseline_median:>10.2f} -> {median:>10.2f} ms ({change:+.0%}){' REGRESSED' if regressed else ''}")
+        regressions += regressed
+    if regressions:
+        print(f"{regressions} target(s) regressed by more than {options.tolerance:.0%}.")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
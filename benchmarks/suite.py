@@ -0,0 +1,167 @@
+import hashlib
+import json
+import statistics
+import time
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Count
+from api.models import ShoppingList, ShoppingListItem, Transaction, UserProfile
+from api.services import dispatch
+from api.synthetic import generate_synthetic_data, dump_sqlite, load_sqlite
+
+"""
+    - In-process timings of the hot api paths, against one synthetic organisation of each size in SIZES
+    - Each size is generated with api.synthetic. On SQLite it is generated once and kept as a fixture file in
+      FIXTURES_DIR, named after the size, the seed and the migrations, so later runs load it in seconds.
+    - Each target calls the service behind an api endpoint through api.services.dispatch, the way the dashboard
+      does, with a cold cache. Every call runs in a transaction that is rolled back, so targets that write see
+      the same data every time.
+    - The median of the timed calls is compared with the stored baseline, which is only meaningful on the machine
+      it was recorded on. Record a new baseline with --update-baseline before comparing a change.
+"""
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCHMARKS_DIR / 'baseline.json'
+FIXTURES_DIR = BENCHMARKS_DIR / 'fixtures'
+SEED = 0
+
+# the number of shopping lists of each size, shared between around 10 users
+SIZES = {
+    '10': 10,
+    '1k': 1000,
+    '100k': 100000,
+}
+
+# a change smaller than this, in milliseconds, is never a regression however large it is in proportion
+NOISE_FLOOR_MS = 1.0
+
+# every target: (url name, whether it is called by the admin or a member, the request data given the users)
+TARGETS = {
+    'generate-list': ('api-generate-list', 'admin', lambda admin, member: {'group_items': True}),
+    'get-lists': ('api-get-lists', 'admin', lambda admin, member: {}),
+    'user-detail': ('api-user-detail', 'admin', lambda admin, member: {'user_id': member.id}),
+    'get-shopping-list-items': ('api-get-shopping-list-items', 'member', lambda admin, member: {}),
+    'create-new-list': ('api-create-new-list', 'member', lambda admin, member: {
+        'form_data': {'Fruit': ['Apples', 'Bananas'], 'Dairy': ['Milk']}
+    }),
+}
+
+# the generate_synthetic_data options of a size
+def size_options(size):
+    lists = SIZES[size]
+    return {
+        'seed': SEED,
+        'organisations': 1,
+        'users': 10,
+        'lists': max(1, lists // 10),
+        'items': 5,
+        'payments': max(1, lists // 10),
+        'days': 365,
+        'prefix': f"benchmark-{size}",
+    }
+
+# the fixture file of a size, named so that a change of options or migrations generates it again
+def fixture_path(size):
+    leaf_nodes = sorted(MigrationLoader(None, ignore_no_migrations=True).graph.leaf_nodes())
+    key = hashlib.sha1(json.dumps([size_options(size), leaf_nodes], sort_keys=True).encode()).hexdigest()[:12]
+    return FIXTURES_DIR / f"{size}-{key}.sqlite3"
+
+# fill the database with the data of a size, from its fixture file where there is one
+def prepare_size(size, use_fixtures=True):
+    use_fixtures = use_fixtures and connection.vendor == 'sqlite'
+    path = fixture_path(size) if use_fixtures else None
+    if path is not None and path.exists():
+        load_sqlite(path)
+        return
+    call_command('flush', interactive=False, verbosity=0)
+    generate_synthetic_data(size_options(size))
+    if path is not None:
+        FIXTURES_DIR.mkdir(exist_ok=True)
+        dump_sqlite(path)
+
+# the row counts of the prepared data, to record with the timings
+def row_counts():
+    return {
+        'users': UserProfile.objects.count(),
+        'lists': ShoppingList.objects.count(),
+        'list_items': ShoppingListItem.objects.count(),
+        'transactions': Transaction.objects.count(),
+    }
+
+# load the admin, or the member with the most lists, with their profiles the way api authentication does
+def load_actor(role):
+    return User.objects.select_related('userprofile__organisation').filter(
+        userprofile__user_type='admin' if role == 'admin' else 'user'
+    ).annotate(list_count=Count('shoppinglist')).order_by('-list_count', 'id').first()
+
+# time one call of a target, in milliseconds, leaving the database as it was
+def time_call(url_name, role, data):
+    actor = load_actor(role)
+    cache.clear()
+    with transaction.atomic():
+        started = time.perf_counter()
+        response = dispatch(url_name, actor, data=data)
+        json.dumps(response.json(), default=str)
+        elapsed = (time.perf_counter() - started) * 1000
+        transaction.set_rollback(True)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url_name} returned {response.status_code}: {response.json()}")
+    return elapsed
+
+# time every target at a prepared size, after one untimed warm up call each
+def run_targets(repeat, targets=None):
+    admin = load_actor('admin')
+    member = load_actor('member')
+    results = {}
+    for name, (url_name, role, data) in TARGETS.items():
+        if targets and name not in targets:
+            continue
+        time_call(url_name, role, data(admin, member))
+        timings = [time_call(url_name, role, data(admin, member)) for _ in range(repeat)]
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'max_ms': round(max(timings), 3),
+        }
+    return results
+
+# read the stored baseline, or an empty one
+def read_baseline(path=BASELINE_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {'sizes': {}}
+    return json.loads(path.read_text())
+
+# write the results of a run as the baseline, keeping the stored results of sizes and targets that weren't run
+def write_baseline(results, path=BASELINE_PATH):
+    baseline = read_baseline(path)
+    for size, size_results in results.items():
+        stored = baseline['sizes'].setdefault(size, {'targets': {}})
+        stored['rows'] = size_results['rows']
+        stored['targets'].update(size_results['targets'])
+    Path(path).write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+"""
+    - Compare the results of a run with the baseline
+    - A target regresses when its median is more than tolerance (a fraction) above the baseline median, and
+      more than NOISE_FLOOR_MS above it
+    - Returns a list of (size, target, baseline median, median, change, regressed), with None for the baseline
+      median and change of a target that has no baseline
+"""
+def compare(results, baseline, tolerance):
+    comparisons = []
+    for size, size_results in results.items():
+        baseline_targets = baseline['sizes'].get(size, {}).get('targets', {})
+        for name, timing in size_results['targets'].items():
+            if name not in baseline_targets:
+                comparisons.append((size, name, None, timing['median_ms'], None, False))
+                continue
+            baseline_median = baseline_targets[name]['median_ms']
+            change = (timing['median_ms'] - baseline_median) / baseline_median if baseline_median else 0
+            regressed = change > tolerance and timing['median_ms'] - baseline_median > NOISE_FLOOR_MS
+            comparisons.append((size, name, baseline_median, timing['median_ms'], change, regressed))
+    return comparisons
@@ -1,17 +1,9 @@
 from django import forms
-import requests
 from django.contrib.auth.models import User
-from django.urls import reverse
-from django.conf import settings
-from rest_framework.authtoken.models import Token
 from api.models import ListStatus
+from api.services import dispatch
 from django.core.exceptions import ValidationError
 
-def generate_url(request, endpoint):
-    prefix = "http://" if settings.DEBUG else "https://"
-    url = f"{prefix}{request.get_host()}{reverse(endpoint)}"
-    return url
-
 class RegisterUserForm(forms.Form):
     username = forms.CharField(label="Username", max_length=100)
     email = forms.EmailField(label="Email")
@@ -73,15 +65,10 @@ class AddCustomItemForm(forms.Form):
             self.fields['group'].choices = groups
 
     def get_groups(self, request):
-        url = generate_url(request, 'api-get-groups')
         json = {
             "user_id": request.user.id
         }
-        token, _ = Token.objects.get_or_create(user=request.user)
-        headers = {
-            'Authorization': f'Token {token}'
-        }
-        r = requests.post(url, headers=headers, json=json)
+        r = dispatch('api-get-groups', request.user, data=json)
         group_tuples = []
         if r.status_code == 200:
             if r.json()['user_type'] == 'admin':
@@ -128,15 +115,10 @@ class NewShoppingListForm(forms.Form):
                 self.initial[group] = items
 
     def get_groups(self, request):
-        url = generate_url(request, 'api-get-shopping-list-items')
         json = {
             "user_id": request.user.id
         }
-        token, _ = Token.objects.get_or_create(user=request.user)
-        headers = {
-            'Authorization': f'Token {token}'
-        }
-        r = requests.post(url, headers=headers, json=json)
+        r = dispatch('api-get-shopping-list-items', request.user, data=json)
         groups = {}
         if r.status_code == 200:
             groups = r.json()
@@ -1,6 +1,3 @@
-import requests
-from django.urls import reverse
-from django.conf import settings
 from django.shortcuts import render, redirect
 from django.views.generic import TemplateView
 from django.contrib.auth.forms import UserCreationForm
@@ -15,6 +12,7 @@ from .forms import (
 )
 from django.contrib.auth.models import User
 from api.models import UserProfile
+from api.services import dispatch, get_user_profile
 from rest_framework.authtoken.models import Token
 
 """
@@ -22,35 +20,20 @@ from rest_framework.authtoken.models import Token
 """
 class BaseView(TemplateView):
 
-    # generate a url to make a request on the api endpoint
-    def generate_url(self, request, endpoint):
-        prefix = "http://" if settings.DEBUG else "https://"
-        url = f"{prefix}{request.get_host()}{reverse(endpoint)}"
-        return url
-
     # get the user type of the user making the request
+    # the profile is cached on request.user, so the services called for the page reuse it
     def get_user_type(self, request):
-        user_id = request.user.id
-        user = User.objects.filter(id=user_id).first()
-        user_profile = UserProfile.objects.filter(user=user).first()
+        user_profile = get_user_profile(request.user)
         user_type = user_profile.user_type
         return user_type
 
-    # make a request of the given type to the api endpoint
+    # call the service behind the api endpoint in-process
     # **kwargs are the json payload of the request
     def make_request(self, request, endpoint, request_type, token=None, **kwargs):
-        url = self.generate_url(request, endpoint)
-        if not token:
-            token, _ = Token.objects.get_or_create(user=request.user)
-        headers = {
-            'Authorization': f'Token {token}'
-        }
-        if request_type == 'POST':
-            return requests.post(url, headers=headers, json=kwargs)
-        else:
-            return requests.get(url, headers=headers)
+        user = token.user if token else request.user
+        return dispatch(endpoint, user, data=kwargs, method=request_type)
 
-    # a decorator function that makes a request to the api to determine if a user has admin status
+    # a decorator function that asks the api whether a user has admin status
     # redirects non admin users to the dashboard home page
     def admin_status_required(func):
         def inner(*args):
@@ -59,22 +42,14 @@ class BaseView(TemplateView):
             if not request.user.is_authenticated:
                 return redirect('dashboard-login')
             else:
-                url = self.generate_url(request, 'api-user-is-admin')
-                json = {
-
-                }
-                token, _ = Token.objects.get_or_create(user=request.user)
-                headers = {
-                    'Authorization': f'Token {token}'
-                }
-                r = requests.post(url, headers=headers, json=json)
+                r = self.make_request(request, 'api-user-is-admin', 'POST')
                 if r.status_code == 200 and r.json()['is_admin']:
                     return func(self, request)
                 else:
                     return redirect('dashboard-index')
         return inner
 
-    # a decorator function that makes a request to the api to determine if a user has 'user status
+    # a decorator function that asks the api whether a user has 'user status
     # redirects non 'user' users to the dashboard home page
     def user_status_required(func):
         def inner(*args):
@@ -83,15 +58,7 @@ class BaseView(TemplateView):
             if not request.user.is_authenticated:
                 return redirect('login')
             else:
-                url = self.generate_url(request, 'api-user-is-admin')
-                json = {
-
-                }
-                token, _ = Token.objects.get_or_create(user=request.user)
-                headers = {
-                    'Authorization': f'Token {token}'
-                }
-                r = requests.post(url, headers=headers, json=json)
+                r = self.make_request(request, 'api-user-is-admin', 'POST')
                 if r.status_code == 200 and r.json()['is_admin'] == False:
                     return func(self, request)
                 else:
@@ -223,11 +190,15 @@ class GetAllUsers(BaseView):
         r = self.make_request(
             request,
             'api-get-all-users',
-            'GET'
+            'GET',
+            search=request.GET.get('search'),
+            cursor=request.GET.get('cursor')
         )
         if r.status_code == 200:
             users = r.json()['user_profiles']
             context['users'] = users
+            context['search'] = request.GET.get('search', '')
+            context['next_cursor'] = r.json()['next_cursor']
         elif r.status_code == 401:
             context['errors'] = r.json()['detail']
         else:
@@ -414,11 +385,13 @@ class ListsView(BaseView):
         r = self.make_request(
             request,
             'api-get-lists',
-            'POST'
+            'POST',
+            cursor=request.GET.get('cursor')
         )
         if r.status_code == 200:
             data = r.json()['lists']
             context['data'] = data
+            context['next_cursor'] = r.json()['next_cursor']
         elif r.status_code == 400:
             context['errors'] = r.json()['detail']
         elif r.status_code == 401:
@@ -507,10 +480,12 @@ class GenerateListView(BaseView):
             request,
             'api-generate-list',
             'POST',
+            group_items=True
         )
         if r.status_code == 200:
             list_items = r.json()['list_items']
             context['list_items'] = list_items
+            context['groups'] = r.json()['groups']
         elif r.status_code == 400:
             errors = r.json()['detail']
         elif r.status_code == 401:
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import django_heroku
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,12 +45,13 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'shopping_list_api',
-    'api',
+    'api.apps.ApiConfig',
     'dashboard',
     'transmission',
 ]
 
 MIDDLEWARE = [
+    'transmission.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,11 +86,58 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# the groups and items every new organisation starts with
+DEFAULT_ORGANISATION_CATALOG = BASE_DIR / 'api' / 'data' / 'default_catalog.json'
+
+# seconds a compiled organisation catalog is cached for
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+# seconds an api request principal (token, user, profile and organisation) is cached for
+PRINCIPAL_CACHE_TIMEOUT = 300
+
+# seconds the list status table is cached for. The cache is per process, so this bounds how long another
+# worker can keep reading a status table that has been changed.
+STATUS_CACHE_TIMEOUT = 300
+
+# the most sub-requests one api batch request can hold
+API_BATCH_MAX_REQUESTS = 25
+
+# threads used to hash passwords during bulk user imports. None uses one per cpu core.
+PASSWORD_HASHING_WORKERS = None
+
+# seconds between writes of the buffered api errors to the database. 0 writes every error as it is logged.
+API_ERROR_FLUSH_INTERVAL = 5
+
+# the most different api errors buffered before they are written early
+API_ERROR_BUFFER_SIZE = 500
+
+# days detailed api errors are kept before rollup_api_errors rolls them up into hourly summaries
+API_ERROR_RETENTION_DAYS = 30
+
+# the memory mapped file the request metrics of every worker process on this machine are kept in
+METRICS_FILE = os.environ.get('METRICS_FILE', os.path.join(tempfile.gettempdir(), 'shopping-list-api-metrics'))
+
+# the most url names request metrics are kept for separately
+METRICS_MAX_ROUTES = 128
+
+
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
@@ -1,6 +1,5 @@
-from datetime import datetime
-from .models import APIError
+from .sink import default_sink
 
-def log_api_error(error, endpoint, log_time=datetime.now()):
-    error = APIError(error=error, endpoint=endpoint, log_time=log_time)
-    error.save()
\ No newline at end of file
+# record an api error, to be saved the next time the error sink is flushed
+def log_api_error(error, endpoint, log_time=None):
+    default_sink.record(error, endpoint, log_time)
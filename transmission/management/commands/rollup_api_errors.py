@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from transmission.rollup import ROLLUP_CHUNK_SIZE, rollup_cutoff, rollup_api_errors
+
+"""
+    - Roll api errors older than the retention window up into hourly per-endpoint summaries and delete them
+    - Safe to run from cron: the work is done in short chunks, and a run that is interrupted or overlaps another
+      run leaves the counts correct
+"""
+class Command(BaseCommand):
+    help = "Roll API errors older than the retention window up into hourly summaries, deleting them in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.API_ERROR_RETENTION_DAYS,
+            help="Keep detailed errors for this many days. Defaults to API_ERROR_RETENTION_DAYS."
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ROLLUP_CHUNK_SIZE,
+            help="The most errors rolled up and deleted in one transaction."
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['chunk_size'] < 1:
+            raise CommandError("--days can't be negative and --chunk-size must be at least 1.")
+        cutoff = rollup_cutoff(options['days'])
+        rolled_up = rollup_api_errors(cutoff, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {rolled_up} error(s) last seen before {cutoff}."))
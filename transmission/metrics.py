@@ -0,0 +1,177 @@
+import fcntl
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_left
+from contextlib import contextmanager
+from django.conf import settings
+
+"""
+    - Per-route request metrics shared by every worker process on a machine
+    - Each route (url name) has a fixed-size slot in a memory mapped file, METRICS_FILE. A slot holds a
+      histogram of request latency, database queries and response size. Every worker maps the same file, so
+      the histograms add up the requests of all the workers.
+    - An update takes a lock on the file, adds to a few numbers in place and releases the lock, so recording
+      a request costs a few microseconds
+    - The file is laid out for METRICS_MAX_ROUTES routes. Requests for routes beyond that are counted under
+      OVERFLOW_ROUTE.
+"""
+
+# (name, help, bucket upper bounds) of each histogram kept for every route
+HISTOGRAMS = (
+    (
+        'http_request_duration_seconds',
+        "Time taken to respond to a request.",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    ),
+    (
+        'http_request_db_queries',
+        "Database queries made while responding to a request.",
+        (0, 1, 2, 5, 10, 20, 50, 100)
+    ),
+    (
+        'http_response_size_bytes',
+        "Size of the response body. Streamed responses are counted as 0.",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+    ),
+)
+
+OVERFLOW_ROUTE = 'other'
+NAME_SIZE = 64
+# each histogram stores a count for each bucket, a count for values above the last bucket and the sum of the values
+SLOT_VALUES = sum(len(buckets) + 2 for name, help_text, buckets in HISTOGRAMS)
+SLOT_SIZE = NAME_SIZE + SLOT_VALUES * 8
+HEADER = struct.Struct('8sI')
+MAGIC = b'SLMETRIC'
+
+# the offset of each histogram's values within a slot's values
+HISTOGRAM_OFFSETS = []
+offset = 0
+for name, help_text, buckets in HISTOGRAMS:
+    HISTOGRAM_OFFSETS.append(offset)
+    offset += len(buckets) + 2
+del offset
+
+class MetricsStore:
+
+    def __init__(self, path, max_routes):
+        self.path = path
+        self.max_routes = max_routes
+        self.size = HEADER.size + max_routes * SLOT_SIZE
+        # identifies the layout, so a file written with different histograms is started again
+        self.layout = zlib.crc32(repr((HISTOGRAMS, NAME_SIZE, max_routes)).encode())
+        self.pid = None
+        self.slots = {}
+
+    # map the file, once per process
+    def open(self):
+        if self.pid == os.getpid():
+            return
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self.locked():
+            if os.fstat(self.fd).st_size < self.size:
+                os.ftruncate(self.fd, self.size)
+            self.buffer = mmap.mmap(self.fd, self.size)
+            magic, layout = HEADER.unpack_from(self.buffer, 0)
+            if magic != MAGIC or layout != self.layout:
+                self.buffer[:] = bytes(self.size)
+                HEADER.pack_into(self.buffer, 0, MAGIC, self.layout)
+        self.slots = {}
+        self.pid = os.getpid()
+
+    @contextmanager
+    def locked(self, shared=False):
+        fcntl.flock(self.fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def slot_offset(self, index):
+        return HEADER.size + index * SLOT_SIZE
+
+    def slot_name(self, index):
+        offset = self.slot_offset(index)
+        return self.buffer[offset:offset + NAME_SIZE].rstrip(b'\0').decode()
+
+    # find the slot of a route, claiming a free slot for a new route. Called with the lock held.
+    def find_slot(self, route):
+        if route in self.slots:
+            return self.slots[route]
+        encoded = route.encode()[:NAME_SIZE]
+        route = encoded.decode(errors='ignore')
+        overflow_index = None
+        for index in range(self.max_routes):
+            name = self.slot_name(index)
+            if not name:
+                # keep the last slot for the overflow route
+                if index == self.max_routes - 1 and route != OVERFLOW_ROUTE:
+                    return self.find_slot(OVERFLOW_ROUTE)
+                offset = self.slot_offset(index)
+                self.buffer[offset:offset + len(encoded)] = encoded
+                name = route
+            if name == route:
+                self.slots[route] = index
+                return index
+            if name == OVERFLOW_ROUTE:
+                overflow_index = index
+        return overflow_index if overflow_index is not None else self.max_routes - 1
+
+    # add one request's latency, query count and response size to a route's histograms
+    def observe(self, route, values):
+        self.open()
+        with self.locked():
+            base = self.slot_offset(self.find_slot(route)) + NAME_SIZE
+            for (name, help_text, buckets), histogram_offset, value in zip(HISTOGRAMS, HISTOGRAM_OFFSETS, values):
+                bucket_offset = base + (histogram_offset + bisect_left(buckets, value)) * 8
+                sum_offset = base + (histogram_offset + len(buckets) + 1) * 8
+                struct.pack_into('d', self.buffer, bucket_offset, struct.unpack_from('d', self.buffer, bucket_offset)[0] + 1)
+                struct.pack_into('d', self.buffer, sum_offset, struct.unpack_from('d', self.buffer, sum_offset)[0] + value)
+
+    # read every route's values, as {route: [values]}
+    def snapshot(self):
+        self.open()
+        routes = {}
+        with self.locked(shared=True):
+            for index in range(self.max_routes):
+                name = self.slot_name(index)
+                if name:
+                    routes[name] = struct.unpack_from(f'{SLOT_VALUES}d', self.buffer, self.slot_offset(index) + NAME_SIZE)
+        return routes
+
+# escape a prometheus label value
+def label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# format a number for prometheus, without a decimal point for whole numbers
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+# render a snapshot in the prometheus text exposition format
+def render_prometheus(routes):
+    lines = []
+    for (name, help_text, buckets), histogram_offset in zip(HISTOGRAMS, HISTOGRAM_OFFSETS):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for route, values in sorted(routes.items()):
+            label = f'route="{label_value(route)}"'
+            counts = values[histogram_offset:histogram_offset + len(buckets) + 1]
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label},le="{format_number(bound)}"}} {format_number(cumulative)}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {format_number(cumulative)}')
+            lines.append(f'{name}_sum{{{label}}} {format_number(values[histogram_offset + len(buckets) + 1])}')
+            lines.append(f'{name}_count{{{label}}} {format_number(cumulative)}')
+    return "\n".join(lines) + "\n"
+
+_store = None
+
+# the store for this process, mapped from settings.METRICS_FILE
+def get_metrics_store():
+    global _store
+    if _store is None:
+        _store = MetricsStore(str(settings.METRICS_FILE), settings.METRICS_MAX_ROUTES)
+    return _store
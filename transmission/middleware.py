@@ -0,0 +1,38 @@
+import logging
+import time
+from django.db import connection
+from .metrics import get_metrics_store
+
+logger = logging.getLogger(__name__)
+
+"""
+    - Records the latency, database query count and response size of every request in the shared
+      metrics store (transmission.metrics), keyed by the url name of the view that handled it
+    - Queries are counted with a database execute wrapper, so counting works without DEBUG
+"""
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.view_name if resolver_match and resolver_match.view_name else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        try:
+            get_metrics_store().observe(route, (duration, queries[0], size))
+        except OSError:
+            # metrics must never break a request
+            logger.exception("Could not record request metrics.")
+        return response
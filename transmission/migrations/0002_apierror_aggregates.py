@@ -0,0 +1,44 @@
+# Generated by Django 3.1.4 on 2026-10-18 07:00
+
+import hashlib
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_aggregates(apps, schema_editor):
+    APIError = apps.get_model('transmission', 'APIError')
+    APIError.objects.update(first_seen=F('log_time'))
+    api_errors = []
+    for api_error in APIError.objects.only('id', 'endpoint', 'error').iterator():
+        api_error.fingerprint = hashlib.sha1(f"{api_error.endpoint}\n{api_error.error}".encode()).hexdigest()
+        api_errors.append(api_error)
+        if len(api_errors) == 1000:
+            APIError.objects.bulk_update(api_errors, ['fingerprint'])
+            api_errors = []
+    APIError.objects.bulk_update(api_errors, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transmission', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apierror',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='apierror',
+            name='fingerprint',
+            field=models.CharField(db_index=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='apierror',
+            name='first_seen',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
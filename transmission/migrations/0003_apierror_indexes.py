@@ -0,0 +1,21 @@
+# Generated by Django 3.1.4 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transmission', '0002_apierror_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apierror',
+            index=models.Index(fields=['endpoint', 'log_time'], name='apierror_endpoint_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apierror',
+            index=models.Index(fields=['log_time'], name='apierror_time_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.4 on 2026-10-18 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transmission', '0003_apierror_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIErrorHourlySummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('endpoint', models.CharField(max_length=150)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('hour', 'endpoint')},
+            },
+        ),
+    ]
@@ -3,7 +3,33 @@ from django.db import models
 class APIError(models.Model):
     error = models.TextField()
     endpoint = models.CharField(max_length=150)
+    # identifies repeats of the same error, see transmission.sink
+    fingerprint = models.CharField(max_length=40, db_index=True, default='')
+    # the number of times the error was raised between first_seen and log_time
+    count = models.PositiveIntegerField(default=1)
+    first_seen = models.DateTimeField(null=True)
+    # the last time the error was raised
     log_time = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['endpoint', 'log_time'], name='apierror_endpoint_time_idx'),
+            models.Index(fields=['log_time'], name='apierror_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.error}"
+
+class APIErrorHourlySummary(models.Model):
+    # the start of the hour the errors were last seen in
+    hour = models.DateTimeField()
+    endpoint = models.CharField(max_length=150)
+    # the number of errors rolled up into the hour
+    errors = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('hour', 'endpoint')
+
     def __str__(self):
-        return f"{self.id} - {self.error}"
\ No newline at end of file
+        return f"{self.hour} - {self.endpoint} - {self.errors}"
@@ -0,0 +1,112 @@
+from datetime import datetime
+from django.db.models import Count, Q, Sum, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from api.pagination import decode_datetime_cursor, paginate
+from .models import APIError, APIErrorHourlySummary
+
+"""
+    - Queries for the api error console
+    - Errors are read a page at a time, newest first, with keyset pagination on (log_time, id), which the
+      (endpoint, log_time) and (log_time) indexes serve with or without an endpoint filter
+    - A cursor that can't be decoded raises ValueError, which the console views answer with a 400
+    - The hourly summary is grouped and counted in the database, and includes the hours transmission.rollup
+      has moved into APIErrorHourlySummary
+"""
+
+ERRORS_PAGE_SIZE = 100
+SUMMARY_PAGE_SIZE = 200
+
+# parse a filter time, an ISO date or datetime in the current time zone, or None if it is blank or invalid
+def parse_filter_time(value):
+    if not value:
+        return None
+    try:
+        time = parse_datetime(value)
+        if time is None:
+            date = parse_date(value)
+            time = datetime(date.year, date.month, date.day) if date else None
+    except ValueError:
+        return None
+    if time is not None and timezone.is_naive(time):
+        time = timezone.make_aware(time)
+    return time
+
+# limit api errors to an endpoint and to errors last seen from start (inclusive) to end (exclusive)
+def filter_api_errors(api_errors, endpoint=None, start=None, end=None):
+    if endpoint:
+        api_errors = api_errors.filter(endpoint=endpoint)
+    if start is not None:
+        api_errors = api_errors.filter(log_time__gte=start)
+    if end is not None:
+        api_errors = api_errors.filter(log_time__lt=end)
+    return api_errors
+
+# get a page of api errors, newest first, and the cursor of the next page
+def get_api_errors_page(endpoint=None, start=None, end=None, cursor=None, page_size=ERRORS_PAGE_SIZE):
+    api_errors = filter_api_errors(APIError.objects.all(), endpoint, start, end).order_by('-log_time', '-id')
+    if cursor:
+        log_time, error_id = decode_datetime_cursor(cursor)
+        api_errors = api_errors.filter(Q(log_time__lt=log_time) | Q(log_time=log_time, id__lt=error_id))
+    return paginate(
+        api_errors[:page_size + 1],
+        page_size,
+        lambda api_error: (api_error.log_time, api_error.id)
+    )
+
+# limit hourly rows to an endpoint and to hours from start to end
+def filter_hours(hours, endpoint=None, start=None, end=None):
+    if endpoint:
+        hours = hours.filter(endpoint=endpoint)
+    if start is not None:
+        # include the hour start falls in
+        hours = hours.filter(hour__gte=start.replace(minute=0, second=0, microsecond=0))
+    if end is not None:
+        hours = hours.filter(hour__lt=end)
+    return hours
+
+# continue hourly rows, ordered newest hour first then by endpoint, from a summary cursor
+def after_summary_cursor(hours, cursor):
+    if not cursor:
+        return hours
+    hour, endpoint = decode_datetime_cursor(cursor, key=str)
+    return hours.filter(Q(hour__lt=hour) | Q(hour=hour, endpoint__gt=endpoint))
+
+# get a page of the number of errors on each endpoint in each hour, newest hour first, and the cursor of the next page
+# hours that have been rolled up by transmission.rollup are read from APIErrorHourlySummary
+def get_api_error_summary_page(endpoint=None, start=None, end=None, cursor=None, page_size=SUMMARY_PAGE_SIZE):
+    live_hours = filter_api_errors(APIError.objects.all(), endpoint, start, end).annotate(
+        hour=TruncHour('log_time')
+    ).values('hour', 'endpoint').annotate(
+        errors=Sum('count'),
+        distinct_errors=Count('fingerprint', distinct=True),
+        last_seen=Max('log_time')
+    ).order_by('-hour', 'endpoint')
+    rolled_up_hours = filter_hours(APIErrorHourlySummary.objects.all(), endpoint, start, end).values(
+        'hour', 'endpoint', 'errors', 'last_seen'
+    ).order_by('-hour', 'endpoint')
+
+    # read a page from each table and merge them, adding together any hour that is in both
+    hours = {}
+    for hour_rows in (
+        after_summary_cursor(live_hours, cursor)[:page_size + 1],
+        after_summary_cursor(rolled_up_hours, cursor)[:page_size + 1]
+    ):
+        for row in hour_rows:
+            key = (row['hour'], row['endpoint'])
+            if key in hours:
+                merged = hours[key]
+                merged['errors'] += row['errors']
+                merged['last_seen'] = max(merged['last_seen'], row['last_seen'])
+                # the rolled up errors aren't told apart
+                merged['distinct_errors'] = None
+            else:
+                hours[key] = dict(row, distinct_errors=row.get('distinct_errors'))
+    rows = sorted(hours.values(), key=lambda row: row['endpoint'])
+    rows.sort(key=lambda row: row['hour'], reverse=True)
+    return paginate(
+        rows[:page_size + 1],
+        page_size,
+        lambda row: (row['hour'], row['endpoint'])
+    )
@@ -0,0 +1,58 @@
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest, TruncHour
+from django.utils import timezone
+from .models import APIError, APIErrorHourlySummary
+
+"""
+    - Keeps the APIError table small by rolling old errors up into APIErrorHourlySummary
+    - Errors last seen before the retention window are counted into their hour and endpoint's summary row and
+      then deleted, a chunk at a time. Each chunk is its own short transaction, so the table is never locked for
+      long and an interrupted run can simply be run again.
+    - Only whole hours are rolled up, so an hour is never split between the two tables
+"""
+
+ROLLUP_CHUNK_SIZE = 1000
+
+# the time before which whole hours of errors are rolled up
+def rollup_cutoff(retention_days):
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    return cutoff.replace(minute=0, second=0, microsecond=0)
+
+# count the errors with the given ids into the hourly summary and delete them, returning the number deleted
+def rollup_chunk(error_ids):
+    hours = APIError.objects.filter(id__in=error_ids).annotate(
+        hour=TruncHour('log_time')
+    ).values('hour', 'endpoint').annotate(
+        errors=Sum('count'),
+        last_seen=Max('log_time')
+    ).order_by()
+    hours = list(hours)
+
+    # start a summary row for any hour that doesn't have one yet, then add to every row
+    APIErrorHourlySummary.objects.bulk_create([
+        APIErrorHourlySummary(hour=hour['hour'], endpoint=hour['endpoint'], errors=0, last_seen=hour['last_seen'])
+        for hour in hours
+    ], ignore_conflicts=True)
+    for hour in hours:
+        APIErrorHourlySummary.objects.filter(hour=hour['hour'], endpoint=hour['endpoint']).update(
+            errors=F('errors') + hour['errors'],
+            last_seen=Greatest(F('last_seen'), hour['last_seen'])
+        )
+    deleted, _ = APIError.objects.filter(id__in=error_ids).delete()
+    return deleted
+
+# roll up every whole hour of errors before the cutoff, chunk_size errors at a time, returning the number rolled up
+def rollup_api_errors(cutoff, chunk_size=ROLLUP_CHUNK_SIZE):
+    rolled_up = 0
+    while True:
+        with transaction.atomic():
+            old_errors = APIError.objects.filter(log_time__lt=cutoff).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # leave chunks another run is rolling up to that run
+                old_errors = old_errors.select_for_update(skip_locked=True)
+            error_ids = list(old_errors.values_list('id', flat=True)[:chunk_size])
+            if not error_ids:
+                return rolled_up
+            rolled_up += rollup_chunk(error_ids)
@@ -0,0 +1,95 @@
+import atexit
+import hashlib
+import logging
+import threading
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import APIError
+
+logger = logging.getLogger(__name__)
+
+"""
+    - An in-process buffer for api errors, so a failing request doesn't write to the database
+    - Errors are fingerprinted by endpoint and message. Repeats of an error are counted in the buffer, with the
+      time it was first and last seen, and written as one APIError row when the buffer is flushed.
+    - The buffer is flushed in one insert every API_ERROR_FLUSH_INTERVAL seconds by a background thread, as soon
+      as it holds API_ERROR_BUFFER_SIZE different errors, and when the process exits
+    - With an API_ERROR_FLUSH_INTERVAL of 0 every error is written as soon as it is recorded
+"""
+
+# the fingerprint repeats of an error share
+def error_fingerprint(endpoint, error):
+    return hashlib.sha1(f"{endpoint}\n{error}".encode()).hexdigest()
+
+class ErrorSink:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.wake = threading.Event()
+        self.thread = None
+
+    def record(self, error, endpoint, log_time=None):
+        log_time = log_time or timezone.now()
+        fingerprint = error_fingerprint(endpoint, error)
+        with self.lock:
+            api_error = self.pending.get(fingerprint)
+            if api_error is None:
+                self.pending[fingerprint] = APIError(
+                    error=error,
+                    endpoint=endpoint,
+                    fingerprint=fingerprint,
+                    count=1,
+                    first_seen=log_time,
+                    log_time=log_time
+                )
+            else:
+                api_error.count += 1
+                api_error.first_seen = min(api_error.first_seen, log_time)
+                api_error.log_time = max(api_error.log_time, log_time)
+            full = len(self.pending) >= settings.API_ERROR_BUFFER_SIZE
+
+        if not settings.API_ERROR_FLUSH_INTERVAL:
+            self.flush()
+            return
+        self.start()
+        if full:
+            self.wake.set()
+
+    # write every buffered error to the database in one insert
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if pending:
+            APIError.objects.bulk_create(pending.values())
+        return len(pending)
+
+    # start the background thread that flushes the buffer, once per process
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if self.thread is None:
+                # save whatever is still buffered when the process exits
+                atexit.register(self.flush)
+            self.thread = threading.Thread(target=self.run, name='api-error-sink', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wake.wait(settings.API_ERROR_FLUSH_INTERVAL)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # the errors can't be saved, so don't let them build up in memory either
+                logger.exception("Could not save buffered api errors.")
+            finally:
+                # the thread's connection isn't closed at the end of a request like the request threads' are
+                connection.close()
+
+# the sink log_api_error records to
+default_sink = ErrorSink()
@@ -0,0 +1,54 @@
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from api.pagination import encode_cursor
+from transmission.models import APIError
+
+"""
+    - The api error console pages through errors with the cursor of the previous page, and answers a cursor
+      that can't be decoded with a 400
+"""
+
+# cursors edited by hand: not base64, not utf-8, the wrong number of values, and values of the wrong type
+INVALID_CURSORS = [
+    '%%%',
+    urlsafe_b64encode(b'\xff\xfe').decode(),
+    encode_cursor('2021-01-01T00:00:00+00:00'),
+    encode_cursor('yesterday', 1),
+    encode_cursor('2021-13-01T00:00:00+00:00', 1),
+]
+
+# the pages are rendered without collecting the static files first
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class APIErrorConsoleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create(username='console-superuser', is_superuser=True)
+        now = timezone.now()
+        APIError.objects.bulk_create([
+            APIError(error="Boom", endpoint='api-get-lists', first_seen=now, log_time=now - timedelta(hours=hours))
+            for hours in range(3)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.superuser)
+
+    def test_errors_page(self):
+        url = reverse('transmission-api-error')
+        response = self.client.get(url, {'cursor': encode_cursor(timezone.now(), 0)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['api_errors']), 3)
+        for cursor in INVALID_CURSORS + [encode_cursor('2021-01-01T00:00:00+00:00', 'abc')]:
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400, cursor)
+
+    def test_summary_page(self):
+        url = reverse('transmission-api-error-summary')
+        response = self.client.get(url, {'cursor': encode_cursor(timezone.now() + timedelta(hours=1), '')})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['hours']), 3)
+        for cursor in INVALID_CURSORS:
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400, cursor)
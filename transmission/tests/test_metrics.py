@@ -0,0 +1,50 @@
+import os
+import tempfile
+from django.test import SimpleTestCase
+from transmission.metrics import HISTOGRAMS, MetricsStore, OVERFLOW_ROUTE, render_prometheus
+
+"""
+    - The shared metrics file: every store mapping the file adds to the same histograms, routes beyond the
+      file's slots are counted under the overflow route, and a file with another layout is started again
+"""
+
+class MetricsStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        file_descriptor, self.path = tempfile.mkstemp()
+        os.close(file_descriptor)
+        self.addCleanup(os.remove, self.path)
+
+    def test_stores_share_the_file(self):
+        MetricsStore(self.path, 4).observe('api-get-lists', (0.003, 4, 300))
+        store = MetricsStore(self.path, 4)
+        store.observe('api-get-lists', (0.2, 4, 300))
+        values = store.snapshot()['api-get-lists']
+
+        duration_buckets = HISTOGRAMS[0][2]
+        self.assertEqual(values[0], 1)
+        self.assertEqual(values[duration_buckets.index(0.25)], 1)
+        self.assertEqual(sum(values[:len(duration_buckets) + 1]), 2)
+        self.assertAlmostEqual(values[len(duration_buckets) + 1], 0.203)
+
+    def test_routes_beyond_the_slots_overflow(self):
+        store = MetricsStore(self.path, 3)
+        for route in ('api-get-lists', 'api-user-detail', 'api-update-list', 'api-update-lists'):
+            store.observe(route, (0.01, 1, 100))
+        routes = store.snapshot()
+        self.assertEqual(set(routes), {'api-get-lists', 'api-user-detail', OVERFLOW_ROUTE})
+        self.assertEqual(sum(routes[OVERFLOW_ROUTE][:len(HISTOGRAMS[0][2]) + 1]), 2)
+
+    def test_a_file_with_another_layout_is_started_again(self):
+        MetricsStore(self.path, 4).observe('api-get-lists', (0.01, 1, 100))
+        self.assertEqual(MetricsStore(self.path, 8).snapshot(), {})
+
+    def test_render_prometheus(self):
+        store = MetricsStore(self.path, 4)
+        store.observe('api-"get"-lists', (0.01, 3, 100))
+        text = render_prometheus(store.snapshot())
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="api-\\"get\\"-lists",le="0.005"} 0', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="api-\\"get\\"-lists",le="0.01"} 1', text)
+        self.assertIn('http_request_db_queries_sum{route="api-\\"get\\"-lists"} 3', text)
+        self.assertIn('http_response_size_bytes_count{route="api-\\"get\\"-lists"} 1', text)
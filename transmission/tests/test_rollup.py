@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from transmission.models import APIError, APIErrorHourlySummary
+from transmission.rollup import rollup_api_errors, rollup_cutoff
+
+"""
+    - Rolling up old api errors: whole hours before the cutoff are counted into hourly summaries and deleted,
+      and running the rollup again doesn't count them twice
+"""
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.cutoff = rollup_cutoff(30)
+        self.hour = self.cutoff - timedelta(hours=3)
+
+    def create_error(self, endpoint, log_time, count=1):
+        return APIError.objects.create(error="Boom", endpoint=endpoint, count=count, first_seen=log_time, log_time=log_time)
+
+    def summaries(self):
+        return {
+            (summary.hour, summary.endpoint): (summary.errors, summary.last_seen)
+            for summary in APIErrorHourlySummary.objects.all()
+        }
+
+    def test_old_errors_are_rolled_up_by_hour(self):
+        self.create_error('api-get-lists', self.hour + timedelta(minutes=10), count=2)
+        self.create_error('api-get-lists', self.hour + timedelta(minutes=50), count=3)
+        self.create_error('api-get-lists', self.hour + timedelta(hours=1))
+        self.create_error('api-user-detail', self.hour + timedelta(minutes=20))
+        recent_error = self.create_error('api-get-lists', self.cutoff + timedelta(minutes=1))
+
+        self.assertEqual(rollup_api_errors(self.cutoff, chunk_size=2), 4)
+        self.assertEqual(list(APIError.objects.values_list('id', flat=True)), [recent_error.id])
+        self.assertEqual(self.summaries(), {
+            (self.hour, 'api-get-lists'): (5, self.hour + timedelta(minutes=50)),
+            (self.hour + timedelta(hours=1), 'api-get-lists'): (1, self.hour + timedelta(hours=1)),
+            (self.hour, 'api-user-detail'): (1, self.hour + timedelta(minutes=20)),
+        })
+
+        # a second run finds nothing left to roll up
+        self.assertEqual(rollup_api_errors(self.cutoff), 0)
+        self.assertEqual(self.summaries()[(self.hour, 'api-get-lists')][0], 5)
+
+    def test_later_errors_are_added_to_an_hour(self):
+        self.create_error('api-get-lists', self.hour + timedelta(minutes=50), count=2)
+        rollup_api_errors(self.cutoff)
+        self.create_error('api-get-lists', self.hour + timedelta(minutes=10))
+        rollup_api_errors(self.cutoff)
+        self.assertEqual(self.summaries(), {
+            (self.hour, 'api-get-lists'): (3, self.hour + timedelta(minutes=50)),
+        })
+
+    def test_command(self):
+        self.create_error('api-get-lists', self.hour)
+        stdout = StringIO()
+        call_command('rollup_api_errors', '--days', '30', stdout=stdout)
+        self.assertIn("Rolled up 1 error(s)", stdout.getvalue())
+        self.assertFalse(APIError.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('rollup_api_errors', '--chunk-size', '0', stdout=StringIO())
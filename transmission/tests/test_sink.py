@@ -0,0 +1,55 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from transmission.models import APIError
+from transmission.sink import ErrorSink, error_fingerprint
+
+"""
+    - Buffered api errors: repeats are counted into one row, and the buffer is written when it is flushed,
+      when it fills up, or at once without a flush interval
+"""
+
+@override_settings(API_ERROR_FLUSH_INTERVAL=60, API_ERROR_BUFFER_SIZE=3)
+class ErrorSinkTests(TestCase):
+
+    def setUp(self):
+        self.sink = ErrorSink()
+        # the background thread isn't started, so the buffer is only written when a test flushes it
+        patcher = mock.patch.object(self.sink, 'start')
+        self.start = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeats_are_counted_and_written_on_flush(self):
+        now = timezone.now()
+        self.sink.record("Boom", 'api-get-lists', now)
+        self.sink.record("Boom", 'api-get-lists', now - timedelta(minutes=5))
+        self.sink.record("Boom", 'api-get-lists', now + timedelta(minutes=5))
+        self.sink.record("Boom", 'api-user-detail', now)
+        self.assertEqual(APIError.objects.count(), 0)
+        self.assertTrue(self.start.called)
+
+        self.assertEqual(self.sink.flush(), 2)
+        api_error = APIError.objects.get(endpoint='api-get-lists')
+        self.assertEqual(api_error.fingerprint, error_fingerprint('api-get-lists', "Boom"))
+        self.assertEqual(api_error.count, 3)
+        self.assertEqual((api_error.first_seen, api_error.log_time), (now - timedelta(minutes=5), now + timedelta(minutes=5)))
+        self.assertEqual(APIError.objects.get(endpoint='api-user-detail').count, 1)
+
+        # the buffer is empty after a flush
+        self.assertEqual(self.sink.flush(), 0)
+        self.assertEqual(APIError.objects.count(), 2)
+
+    def test_a_full_buffer_wakes_the_flush_thread(self):
+        for number in range(2):
+            self.sink.record(f"Boom {number}", 'api-get-lists')
+        self.assertFalse(self.sink.wake.is_set())
+        self.sink.record("Boom 2", 'api-get-lists')
+        self.assertTrue(self.sink.wake.is_set())
+
+    @override_settings(API_ERROR_FLUSH_INTERVAL=0)
+    def test_no_flush_interval_writes_at_once(self):
+        self.sink.record("Boom", 'api-get-lists')
+        self.sink.record("Boom", 'api-get-lists')
+        self.assertEqual(APIError.objects.filter(endpoint='api-get-lists').count(), 2)
+        self.assertFalse(self.start.called)
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import APIErrorView
+from .views import APIErrorView, APIErrorSummaryView, MetricsView
 
 urlpatterns = [
-    path('api-errors/', APIErrorView.as_view(), name='transmission-api-error')
+    path('api-errors/', APIErrorView.as_view(), name='transmission-api-error'),
+    path('api-errors/summary/', APIErrorSummaryView.as_view(), name='transmission-api-error-summary'),
+    path('metrics/', MetricsView.as_view(), name='transmission-metrics')
 ]
@@ -1,22 +1,95 @@
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, redirect
 from django.views.generic import TemplateView
-from .models import APIError
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
+from api.authentication import CachedTokenAuthentication
+from .metrics import get_metrics_store, render_prometheus
+from .queries import parse_filter_time, get_api_errors_page, get_api_error_summary_page
 
-class APIErrorView(TemplateView):
+"""
+    - Base view for the api error console
+    - Reads the endpoint and time range filters from the query string, and builds the link to the next page
+      with the same filters
+    - A cursor that can't be decoded, eg. one edited by hand, gets a 400
+"""
+class APIErrorConsoleView(TemplateView):
+
+    def get_filters(self, request):
+        return {
+            'endpoint': request.GET.get('endpoint', '').strip(),
+            'start': request.GET.get('start', ''),
+            'end': request.GET.get('end', '')
+        }
+
+    def get_page(self, request, get_page):
+        filters = self.get_filters(request)
+        rows, next_cursor = get_page(
+            endpoint=filters['endpoint'],
+            start=parse_filter_time(filters['start']),
+            end=parse_filter_time(filters['end']),
+            cursor=request.GET.get('cursor')
+        )
+        next_query = None
+        if next_cursor:
+            query = request.GET.copy()
+            query['cursor'] = next_cursor
+            next_query = query.urlencode()
+        return rows, {
+            'filters': filters,
+            'next_query': next_query
+        }
+
+class APIErrorView(APIErrorConsoleView):
     template_name = "transmission/api-error.html"
 
     def get(self, request):
         if request.user.is_superuser:
-            context = {
-                'api_errors': []
-            }
-            errors = APIError.objects.order_by('-log_time').all()
+            try:
+                errors, context = self.get_page(request, get_api_errors_page)
+            except ValueError:
+                return HttpResponseBadRequest("Invalid cursor.")
+            context['api_errors'] = []
             for error in errors:
                 error_object = {
                     'endpoint': error.endpoint,
                     'error': error.error,
+                    'count': error.count,
+                    'first_seen': error.first_seen,
                     'log_time': error.log_time
                 }
                 context['api_errors'].append(error_object)
             return render(request, self.template_name, context=context)
-        return redirect('home-index')
\ No newline at end of file
+        return redirect('home-index')
+
+"""
+    - The number of api errors on each endpoint in each hour, counted in the database
+"""
+class APIErrorSummaryView(APIErrorConsoleView):
+    template_name = "transmission/api-error-summary.html"
+
+    def get(self, request):
+        if request.user.is_superuser:
+            try:
+                hours, context = self.get_page(request, get_api_error_summary_page)
+            except ValueError:
+                return HttpResponseBadRequest("Invalid cursor.")
+            context['hours'] = hours
+            return render(request, self.template_name, context=context)
+        return redirect('home-index')
+
+"""
+    - The request metrics of every worker, in the prometheus text format
+    - Superusers only, logged in or with their api token so a prometheus server can scrape it
+"""
+class MetricsView(APIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+
+    def get(self, request):
+        if not request.user.is_superuser:
+            raise PermissionDenied("You are not authorised to view this page.")
+        return HttpResponse(
+            render_prometheus(get_metrics_store().snapshot()),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )